@@ -16,4 +16,4 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-from .fplo_parser import FploParser
+from .fplo_parser import FploParser, ResumeState
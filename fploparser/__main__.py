@@ -16,17 +16,78 @@
 # limitations under the License.
 #
 
+import os
 import sys
 import json
 import logging
+import argparse
 
-from nomad.utils import configure_logging
+from nomad.utils import configure_logging, get_logger
 from nomad.datamodel import EntryArchive
 from fploparser import FploParser
+from fploparser.batch import parse_batch, _to_json
+from fploparser.cache import ParseCache
 
 
 if __name__ == "__main__":
-    configure_logging(console_log_level=logging.DEBUG)
-    archive = EntryArchive()
-    FploParser().parse(sys.argv[1], archive, logging)
-    json.dump(archive.m_to_dict(), sys.stdout, indent=2)
+    argparser = argparse.ArgumentParser(
+        prog='python -m fploparser', description=(
+            'Parses a single FPLO mainfile and prints its archive. Several files or '
+            'directories are parsed in parallel and printed as one JSON line per mainfile.'))
+    argparser.add_argument('paths', nargs='+', help='mainfiles or directories with mainfiles')
+    argparser.add_argument(
+        '-j', '--processes', type=int, default=None,
+        help='number of worker processes, defaults to the number of cpus')
+    argparser.add_argument(
+        '-o', '--output', default=None, help='file to write JSON lines to, defaults to stdout')
+    argparser.add_argument(
+        '--cache', default=None, help='directory of a cache of parsed archives')
+    argparser.add_argument(
+        '--cache-size', type=int, default=None, help='maximum size of the cache in bytes')
+    argparser.add_argument(
+        '--instrument', action='store_true',
+        help='add the time, bytes scanned and matches of each block to the archives')
+    argparser.add_argument(
+        '--quantities', default=None,
+        help=(
+            'comma separated quantities or sections to parse, given by name or metainfo '
+            'path, e.g. section_single_configuration_calculation[-1]/energy_total'))
+    argparser.add_argument(
+        '--header-only', action='store_true',
+        help='only parse the version, date, host, job id and compound from the head of the files')
+    argparser.add_argument(
+        '--tail-only', action='store_true',
+        help='only parse the final energies and the run status from the end of the files')
+    args = argparser.parse_args()
+    quantities = None if args.quantities is None else args.quantities.split(',')
+
+    batch = len(args.paths) > 1 or os.path.isdir(args.paths[0])
+    if not batch and args.processes is None and args.output is None:
+        configure_logging(console_log_level=logging.DEBUG)
+        archive = EntryArchive()
+        cache = None
+        if args.cache is not None:
+            cache = ParseCache(args.cache) if args.cache_size is None else ParseCache(
+                args.cache, max_size=args.cache_size)
+        FploParser(cache=cache, instrument=args.instrument).parse(
+            args.paths[0], archive, get_logger(__name__), quantities=quantities,
+            header_only=args.header_only, tail_only=args.tail_only)
+        # NaN is written as null, as in the batch results
+        json.dump(_to_json(archive.m_to_dict()), sys.stdout, indent=2, allow_nan=False)
+        sys.exit(0)
+
+    output = sys.stdout if args.output is None else open(args.output, 'w')
+    try:
+        report = parse_batch(
+            args.paths, output, processes=args.processes, cache=args.cache,
+            cache_size=args.cache_size, instrument=args.instrument,
+            quantities=quantities, header_only=args.header_only, tail_only=args.tail_only)
+    finally:
+        if args.output is not None:
+            output.close()
+
+    print(
+        '%d files, %.2f MB in %.2f s: %.2f files/s, %.2f MB/s' % (
+            report['files'], report['bytes'] / 1e6, report['elapsed'],
+            report['files_per_second'], report['mb_per_second']),
+        file=sys.stderr)
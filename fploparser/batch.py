@@ -0,0 +1,186 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD.
+# See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+Parses many FPLO mainfiles on a pool of processes and writes one result per file as
+JSON Lines.
+'''
+
+import os
+import json
+import math
+import time
+import multiprocessing
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from nomad.datamodel import EntryArchive
+
+from . import metainfo
+from .fplo_parser import FploParser
+from .out_parser import compressions
+from .cache import ParseCache
+
+# the parser of a worker process and the quantities it parses, set once by init_worker
+_parser: FploParser = None
+_quantities: List[str] = None
+_header_only = False
+_tail_only = False
+
+# size of the file head that is matched against mainfile_contents_re
+sniff_size = 1024
+
+
+def init_worker(
+        cache: str = None, cache_size: int = None, instrument: bool = False,
+        quantities: List[str] = None, header_only: bool = False, tail_only: bool = False):
+    global _parser, _quantities, _header_only, _tail_only
+    _quantities, _header_only, _tail_only = quantities, header_only, tail_only
+    if cache is None:
+        _parser = FploParser(instrument=instrument)
+    elif cache_size is None:
+        _parser = FploParser(cache=ParseCache(cache), instrument=instrument)
+    else:
+        _parser = FploParser(
+            cache=ParseCache(cache, max_size=cache_size), instrument=instrument)
+
+
+def is_mainfile(parser: FploParser, path: str) -> bool:
+    '''
+    Tells if path is an FPLO mainfile from the first kB of the (decompressed) file.
+    '''
+    try:
+        with open(path, 'rb') as f:
+            compression, open_compressed = compressions.get(f.read(3), (None, open))
+        with open_compressed(path, 'rb') as f:  # type: ignore
+            buffer = f.read(sniff_size)
+        decoded_buffer = buffer.decode('utf-8')
+    except Exception:
+        return False
+
+    return parser.is_mainfile(path, 'text/plain', buffer, decoded_buffer, compression)
+
+
+def find_mainfiles(paths: Iterable[str]) -> Iterator[Tuple[str, bool]]:
+    '''
+    Yields the given files and all files under the given directories. The latter have
+    yet to be matched as mainfile, which is told by the second element.
+    '''
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path, False
+            continue
+
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                yield os.path.join(root, name), True
+
+
+def _to_json(value: Any) -> Any:
+    '''
+    Replaces the NaN and infinite floats in value by None, strict JSON has no literal
+    for them.
+    '''
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+
+    return value
+
+
+def parse_mainfile(task: Tuple[str, bool]) -> Tuple[str, int, str]:
+    '''
+    Parses a single mainfile in a worker. Returns the path, the size of the file and the
+    result as a JSON line, the latter is None if the file is not an FPLO mainfile.
+    '''
+    path, match = task
+    if _parser is None:
+        init_worker()
+
+    if match and not is_mainfile(_parser, path):
+        return path, 0, None
+
+    # files that cannot be read are reported like those that fail to parse
+    result: Dict[str, Any] = dict(mainfile=path)
+    size = 0
+    try:
+        size = os.path.getsize(path)
+        archive = EntryArchive()
+        _parser.parse(
+            path, archive, None, quantities=_quantities, header_only=_header_only,
+            tail_only=_tail_only)
+        result['archive'] = archive.m_to_dict()
+    except Exception as e:
+        result['error'] = '%s: %s' % (e.__class__.__name__, e)
+
+    return path, size, json.dumps(_to_json(result), allow_nan=False)
+
+
+def parse_batch(
+        paths: Iterable[str], output, processes: int = None, chunksize: int = 1,
+        cache: str = None, cache_size: int = None, instrument: bool = False,
+        quantities: Iterable[str] = None, header_only: bool = False,
+        tail_only: bool = False):
+    '''
+    Parses the FPLO mainfiles given as files or found under directories on a pool of
+    processes and writes the results to output, one line per mainfile.
+
+    Arguments:
+        paths: the files and directory roots
+        output: the text stream the results are written to
+        processes: the number of worker processes, by default the number of cpus
+        chunksize: the number of files handed to a worker at once
+        cache: optional directory of a parse cache shared by the workers
+        cache_size: the maximum size of the cache in bytes
+        instrument: add the timing of each block of the output to the archives, the
+            cache is not used then
+        quantities: only parse these quantities, see FploParser.parse
+        header_only: only parse the header of the mainfiles, see FploParser.parse
+        tail_only: only parse the final state of the mainfiles, see FploParser.parse
+
+    Returns:
+        The number of parsed files and bytes, the elapsed time and the throughput in
+        files/s and MB/s.
+    '''
+    n_files, n_bytes = 0, 0
+    start = time.perf_counter()
+    # the metainfo is loaded once, forked workers inherit it
+    metainfo.load()
+    with multiprocessing.Pool(
+            processes, initializer=init_worker,
+            initargs=(
+                cache, cache_size, instrument,
+                None if quantities is None else list(quantities), header_only,
+                tail_only)) as pool:
+        results = pool.imap_unordered(parse_mainfile, find_mainfiles(paths), chunksize)
+        for _, size, line in results:
+            if line is None:
+                continue
+            output.write(line)
+            output.write('\n')
+            n_files += 1
+            n_bytes += size
+    elapsed = time.perf_counter() - start
+
+    return dict(
+        files=n_files, bytes=n_bytes, elapsed=elapsed,
+        files_per_second=n_files / elapsed, mb_per_second=n_bytes / elapsed / 1e6)
@@ -0,0 +1,213 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD.
+# See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import json
+import hashlib
+import tempfile
+from typing import Any, Dict, List
+
+from nomad.datamodel import EntryArchive
+from nomad.datamodel.metainfo.common_dft import Run
+
+from .out_parser import compressions
+
+_parser_version: str = None
+
+
+def parser_version() -> str:
+    '''
+    A digest of the sources of the parser and its metainfo, any change of the parser
+    changes its version.
+    '''
+    global _parser_version
+    if _parser_version is None:
+        digest = hashlib.sha256()
+        package = os.path.dirname(os.path.abspath(__file__))
+        for root, dirs, files in os.walk(package):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith('.py') or name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    digest.update(os.path.relpath(path, package).encode())
+                    with open(path, 'rb') as f:
+                        digest.update(f.read())
+        _parser_version = digest.hexdigest()
+
+    return _parser_version
+
+
+def has_input_echo(mainfile: str) -> bool:
+    '''
+    Tells if the output echoes =.in completely. The echo is printed before the first SCF
+    iteration, only the head of the output up to it is read.
+    '''
+    end_marker, scf_marker = b'End  : content of =.in', b'SCF: iteration'
+    try:
+        with open(mainfile, 'rb') as f:
+            _, open_compressed = compressions.get(f.read(3), (None, open))
+        with open_compressed(mainfile, 'rb') as f:  # type: ignore
+            window = b''
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                # the window keeps the end of the previous chunk for markers split by it
+                window = window[-len(end_marker):] + chunk
+                end, scf = window.find(end_marker), window.find(scf_marker)
+                if scf >= 0:
+                    return 0 <= end < scf
+                if end >= 0:
+                    return True
+    except Exception:
+        pass
+
+    return False
+
+
+class ParseCache:
+    '''
+    On-disk cache of the archives parsed from FPLO mainfiles. The archives are keyed by
+    the content of the mainfile and of the =.in file next to it and by the version of the
+    parser, the =.in file is only part of the key if the mainfile has no complete echo of
+    it, as only then it is parsed. Once the cache exceeds its size, the least recently used archives are evicted
+    down to low_water of its size.
+
+    The size is tracked from the archives put since the directory was last scanned, it is
+    only scanned again once the size is exceeded. Archives put by other processes sharing
+    the directory are only accounted for by the next scan.
+
+    Arguments:
+        directory: the directory the archives are stored in
+        max_size: the maximum size of the cache in bytes
+    '''
+    # the fraction of max_size the cache is evicted down to, a scan of the directory
+    # frees room for the archives put until the next one
+    low_water = 0.9
+
+    def __init__(self, directory: str, max_size: int = 1 << 30):
+        self.directory = directory
+        self.max_size = max_size
+        # the size as of the last scan and the archives put since, None before the first
+        self._size: int = None
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, mainfile: str) -> str:
+        digest = hashlib.sha256(parser_version().encode())
+        paths = [mainfile]
+        if not has_input_echo(mainfile):
+            paths.append(os.path.join(os.path.dirname(mainfile), '=.in'))
+        for path in paths:
+            if not os.path.isfile(path):
+                continue
+            digest.update(os.path.basename(path).encode())
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, '%s.json' % key)
+
+    def get(self, key: str) -> List[Dict[str, Any]]:
+        '''
+        Returns the serialized runs stored under key or None.
+        '''
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                runs = json.load(f)
+            # the modification time tells when the archive was last used
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        return runs
+
+    def put(self, key: str, runs: List[Dict[str, Any]]):
+        '''
+        Stores the serialized runs under key and evicts the least recently used archives
+        that exceed the size of the cache.
+        '''
+        path = self._path(key)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        # written to a temporary file first, parallel parsers can share the cache
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(runs, f)
+            size = f.tell()
+        os.replace(tmp_path, path)
+
+        if self._size is not None:
+            self._size += size - replaced
+        if self._size is None or self._size > self.max_size:
+            self.evict()
+
+    def evict(self):
+        '''
+        Scans the cache and evicts the least recently used archives down to low_water of
+        its size if it exceeds its size.
+        '''
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        size = sum(entry[1] for entry in entries)
+        if size > self.max_size:
+            for _, entry_size, path in sorted(entries):
+                if size <= self.max_size * self.low_water:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                size -= entry_size
+        self._size = size
+
+    def load(self, key: str, archive: EntryArchive) -> bool:
+        '''
+        Adds the runs cached under key to archive. Returns False if there are none.
+        '''
+        runs = self.get(key)
+        if runs is None:
+            return False
+
+        if any(
+                name.startswith('x_fplo_t_') or name in (
+                    'section_method', 'section_single_configuration_calculation')
+                for run in runs for name in run):
+            # the input and temporaries metainfo is only loaded if needed, the temporaries
+            # extend the run and the SCF iterations
+            from . import metainfo
+            metainfo.load()
+
+        for run in runs:
+            archive.m_add_sub_section(EntryArchive.section_run, Run.m_from_dict(run))
+
+        return True
+
+    def save(self, key: str, archive: EntryArchive):
+        self.put(key, [run.m_to_dict() for run in archive.section_run])
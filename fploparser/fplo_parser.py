@@ -17,22 +17,613 @@
 # limitations under the License.
 #
 
+import os
+import datetime
+import numpy as np
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
 from nomad.units import ureg
-from nomad.parsing.file_parser import BasicParser
+from nomad.utils import get_logger
+from nomad.parsing import FairdiParser
+from nomad.datamodel import EntryArchive
+from nomad.datamodel.metainfo.common_dft import (
+    Run, Method, System, SingleConfigurationCalculation, ScfIteration)
+
+from . import metainfo
+from .metainfo.fplo import (
+    x_fplo_parser_timing, x_fplo_atomic_energies, x_fplo_basis_radius, x_fplo_symmetry)
+from .out_parser import OutParser
+from .input_parser import InputParser
+from .cache import ParseCache
+
+
+# the blocks of the output the quantities and sections of the archive are parsed from,
+# the quantities of the parser are matched by the longest prefix of their name
+quantity_blocks: Dict[str, List[str]] = {
+    'section_run': [name for name, _, _, _ in OutParser.blocks],
+    'program_name': [],
+    'program_version': ['program_version'],
+    'x_fplo_program_version_sub': ['program_version'],
+    'x_fplo_t_run_hosts': ['run_info'],
+    'time_run_date_start': ['run_info'],
+    'x_fplo_compound': ['compound'],
+    'x_fplo_job_id': ['job_id'],
+    'x_fplo_run_status': ['termination', 'scf_iteration'],
+    'run_clean_end': ['termination'],
+    'section_method': ['input_start', 'input_end'],
+    'x_fplo_in': ['input_start', 'input_end'],
+    'section_system': ['lattice_vectors', 'atom_sites', 'symmetry'],
+    'lattice_vectors': ['lattice_vectors'],
+    'configuration_periodic_dimensions': ['lattice_vectors'],
+    'atom_labels': ['atom_sites'],
+    'atom_positions': ['atom_sites'],
+    'x_fplo_atom': ['atom_sites'],
+    'x_fplo_symmetry': ['symmetry', 'lattice_vectors'],
+    'x_fplo_atomic_energies': ['atomic_energies'],
+    'x_fplo_basis_radius': ['basis_radius'],
+    'x_fplo_scf': ['scf_iteration'],
+    'x_fplo_energy': ['total_energy'],
+    'x_fplo_fermi': ['fermi_energy', 'scf_iteration'],
+    'x_fplo_density': ['density_analysis', 'scf_iteration'],
+    'x_fplo_charge': ['charge'],
+    'x_fplo_site': ['charge'],
+    'x_fplo_cpu_time': ['cpu_time', 'scf_iteration'],
+    'x_fplo_parser_timing': [],
+    'section_single_configuration_calculation': ['total_energy', 'fermi_energy', 'scf_iteration'],
+    'energy_total': ['total_energy'],
+    'energy_reference_fermi': ['fermi_energy'],
+    'section_scf_iteration': ['fermi_energy', 'scf_iteration'],
+    'x_fplo_t_energy_reference_fermi_iteration': ['fermi_energy', 'scf_iteration']}
+
+
+# the quantities of the banner of the output and the compound that follows it
+header_quantities = [
+    'program_version', 'x_fplo_program_version_sub', 'x_fplo_t_run_hosts',
+    'time_run_date_start', 'x_fplo_compound', 'x_fplo_job_id']
+
+
+# the quantities of the final state printed at the end of the output
+tail_quantities = [
+    'section_single_configuration_calculation[-1]', 'x_fplo_scf', 'x_fplo_run_status',
+    'run_clean_end']
+
+
+def select_blocks(quantities: Iterable[str]) -> Tuple[Set[str], bool]:
+    '''
+    Returns the blocks of the output the given quantities are parsed from and if only the
+    last of them is needed. Quantities and sections are given by their name or metainfo
+    path, e.g. section_run/section_single_configuration_calculation/energy_total. The
+    last calculation is given as section_single_configuration_calculation[-1], if all
+    quantities are in it or in the header only the last calculation is parsed.
+    '''
+    blocks: Set[str] = set()
+    final = True
+    for quantity in quantities:
+        path = quantity.strip('/').split('/')
+        name = path[-1].replace('[-1]', '')
+        prefixes = [prefix for prefix in quantity_blocks if name.startswith(prefix)]
+        if not prefixes:
+            raise ValueError('Unknown quantity %s' % quantity)
+        selected = quantity_blocks[max(prefixes, key=len)]
+        blocks.update(selected)
+        if 'section_single_configuration_calculation[-1]' not in path:
+            final = final and set(selected) <= OutParser.header_blocks
 
+    return blocks, final and not blocks <= OutParser.header_blocks
 
-class FploParser(BasicParser):
-    def __init__(self):
-        re_f = r'\-*\d+\.\d+E*\-*\+*\d*'
 
+class ResumeState:
+    '''
+    State of the parsing of a mainfile that is still being written.
+
+    Arguments:
+        archive: the archive parsed so far
+        offset: byte offset of the last complete SCF iteration, parsing resumes from it
+        results: the results of the out parser up to offset
+    '''
+    def __init__(self, archive: EntryArchive, offset: int = 0, results: Dict[str, Any] = None):
+        self.archive = archive
+        self.offset = offset
+        self.results = results if results is not None else dict()
+
+
+class FploParser(FairdiParser):
+    '''
+    Parser for FPLO calculations.
+
+    Arguments:
+        use_mmap: memory-map the mainfile instead of reading it through a buffered stream
+        cache: optional cache of parsed archives, mainfiles found in it are not parsed
+        instrument: add the wall time, bytes scanned and matches of each block of the
+            output to the run. The mainfiles are always parsed, the cache is not used.
+        timing_callback: optional function called with the mainfile and the timing of
+            each block after parsing, implies instrument
+    '''
+    def __init__(
+            self, use_mmap=True, cache: ParseCache = None, instrument=False,
+            timing_callback: Callable[[str, Dict[str, Dict[str, float]]], None] = None):
         super().__init__(
-            specifications=dict(
-                name='parsers/fplo', code_name='fplo', domain='dft',
-                mainfile_contents_re=r'\s*\|\s*FULL-POTENTIAL LOCAL-ORBITAL MINIMUM BASIS BANDSTRUCTURE CODE\s*\|\s*',
-                mainfile_mime_re=r'text/.*'),
-            units_mapping=dict(length=ureg.bohr, energy=ureg.eV),
-            program_version=r'main version\:\s*(\S+)[\|\s]+sub  version\:\s*(\S+)[\|\s]+release\s*\:\s*(\S+)',
-            lattice_vectors=r'lattice vectors\s*(a1\s*\:\s*[\s\S]+?)rec',
-            atom_labels_atom_positions=rf'No\. *Element WPS CPA\-Block *X *Y *Z([\s\S]+?)\n *\n',
-            energy_reference_fermi=(rf'Fermi energy\:\s*({re_f}).+electrons', lambda x: [x]),
-            energy_total=rf'total energy.+\s*EE\:\s*({re_f})')
+            name='parsers/fplo', code_name='fplo', domain='dft',
+            mainfile_contents_re=r'\s*\|\s*FULL-POTENTIAL LOCAL-ORBITAL MINIMUM BASIS BANDSTRUCTURE CODE\s*\|\s*',
+            mainfile_mime_re=r'text/.*', supported_compressions=['gz', 'bz2', 'xz'])
+
+        self.units_mapping = dict(length=ureg.bohr, energy=ureg.eV)
+        # the banner and the compound are within the first kB of the output
+        self.header_size = 4096
+        # the factors from the units of the output to the SI units of the archive, the
+        # values are converted as whole arrays and assigned without units
+        self.unit_factors = {
+            name: ureg.Quantity(1.0, unit).to_base_units().magnitude
+            for name, unit in self.units_mapping.items()}
+        self.out_parser = OutParser(
+            use_mmap=use_mmap, instrument=instrument or timing_callback is not None)
+        self.input_parser = InputParser()
+        self.cache = cache
+        self.timing_callback = timing_callback
+
+    @property
+    def _metainfo_env(self):
+        # the environment is only built if needed
+        return metainfo.m_env
+
+    def init_parser(self):
+        self.out_parser.mainfile = self.filepath
+        self.out_parser.logger = self.logger
+        self.input_parser.mainfile = os.path.join(self.maindir, '=.in')
+        self.input_parser.logger = self.logger
+
+    def parse_header(self):
+        sec_run = self.archive.section_run[0]
+        program_version = self.out_parser.get('program_version')
+        if program_version is not None:
+            sec_run.program_version = program_version
+            sec_run.x_fplo_program_version_sub = self.out_parser.get('program_version_sub')
+
+        date = self.out_parser.get('date')
+        if date is not None:
+            try:
+                # the date is printed without timezone, it is taken as GMT
+                sec_run.time_run_date_start = datetime.datetime.strptime(
+                    date, '%a %b %d %H:%M:%S %Y').replace(
+                        tzinfo=datetime.timezone.utc).timestamp()
+            except ValueError:
+                self.logger.warn('Error parsing the date', data=dict(date=date))
+
+        host = self.out_parser.get('host')
+        if host is not None:
+            # the run is extended by the temporaries of the environment
+            metainfo.load()
+            sec_run.x_fplo_t_run_hosts = host
+
+        sec_run.x_fplo_compound = self.out_parser.get('compound')
+        sec_run.x_fplo_job_id = self.out_parser.get('job_id')
+
+    def parse_system(self):
+        lattice_vectors = self.out_parser.get('lattice_vectors')
+        atom_positions = self.out_parser.get('atom_positions')
+        if lattice_vectors is None and atom_positions is None:
+            return
+
+        # the system of a resumed archive is completed with the results parsed since
+        sec_run = self.archive.section_run[0]
+        if sec_run.section_system:
+            sec_system = sec_run.section_system[0]
+        else:
+            sec_system = sec_run.m_create(System)
+        length_factor = self.unit_factors['length']
+        if lattice_vectors is not None:
+            sec_system.lattice_vectors = lattice_vectors * length_factor
+            sec_system.configuration_periodic_dimensions = [True, True, True]
+
+        if atom_positions is not None:
+            sec_system.atom_labels = self.out_parser.get('atom_labels')
+            sec_system.atom_positions = atom_positions * length_factor
+            sec_system.x_fplo_atom_idx = self.out_parser.get('atom_indices')
+            sec_system.x_fplo_atom_wyckoff_idx = self.out_parser.get('atom_wyckoff_indices')
+            sec_system.x_fplo_atom_cpa_block = self.out_parser.get('atom_cpa_blocks')
+
+    def parse_symmetry(self):
+        symmetry = self.out_parser.get('symmetry')
+        sec_run = self.archive.section_run[0]
+        if symmetry is None or not sec_run.section_system:
+            return
+
+        sec_system = sec_run.section_system[0]
+        sec_symmetry = sec_system.x_fplo_symmetry
+        if sec_symmetry is None:
+            sec_symmetry = sec_system.m_create(x_fplo_symmetry)
+        for key, val in symmetry.items():
+            setattr(sec_symmetry, 'x_fplo_symmetry_%s' % key, val)
+
+    def parse_status(self, complete):
+        # the run is clean if the SCF calculation finished, the status tells if its last
+        # iteration converged. Output without termination is still running unless the
+        # mainfile is complete. Without any output read there is no run to tell about.
+        if not self.out_parser.decodes('termination') or not self.out_parser.results:
+            return
+
+        termination = self.out_parser.get('termination')
+        sec_run = self.archive.section_run[0]
+        if termination is None and not complete:
+            sec_run.x_fplo_run_status = 'running'
+            return
+
+        finished = termination is not None and termination.startswith('Finished')
+        sec_run.run_clean_end = finished
+        if not finished:
+            sec_run.x_fplo_run_status = 'crashed'
+        elif self.out_parser.get('scf_converged'):
+            sec_run.x_fplo_run_status = 'converged'
+        else:
+            sec_run.x_fplo_run_status = 'not converged'
+
+    def parse_input_values(self, section, prefix, values):
+        # the metainfo names are the names of the FEDIT declarations joined by '_', structs
+        # and arrays of structs and flags are sub-sections
+        quantities = section.m_def.all_quantities
+        sub_sections = section.m_def.all_sub_sections
+        for name, value in values.items():
+            name = '%s_%s' % (prefix, name)
+            if name in quantities:
+                section.m_set(quantities[name], value)
+            elif name in sub_sections:
+                sub_section = sub_sections[name]
+                for sub_values in value if isinstance(value, list) else [value]:
+                    self.parse_input_values(
+                        section.m_create(sub_section.sub_section.section_cls, sub_section),
+                        name, sub_values)
+
+    def parse_input(self):
+        # the input echoed in the output is the input the calculation was run with, the
+        # =.in file next to it is only read if there is no complete echo
+        if not self.out_parser.decodes('input_start'):
+            return
+
+        echo = self.out_parser.get('input')
+        if echo is None and (
+                self.out_parser.get('input_echo') is not None or self.input_parser.mainfile is None):
+            # the echo is still being written or there is no input at all
+            return
+
+        # the input metainfo is only loaded for calculations with input
+        x_fplo_in = metainfo.section_cls('x_fplo_in')
+
+        sec_run = self.archive.section_run[0]
+        if sec_run.section_method:
+            sec_method = sec_run.section_method[0]
+            if sec_method.x_fplo_in:
+                return
+        else:
+            sec_method = None
+
+        sections = None
+        if echo is not None:
+            try:
+                sections = self.input_parser.parse_text(echo)
+            except Exception:
+                self.logger.warn('Error parsing the =.in echoed in the output')
+
+        if sections is None and self.input_parser.mainfile is not None:
+            try:
+                sections = self.input_parser.results
+            except Exception:
+                self.logger.warn(
+                    'Error parsing =.in', data=dict(mainfile=self.input_parser.mainfile))
+                return
+
+        if sections:
+            if sec_method is None:
+                sec_method = sec_run.m_create(Method)
+            self.parse_input_values(sec_method.m_create(x_fplo_in), 'x_fplo_in', sections)
+
+    def parse_basis(self):
+        # the tables are printed once for all sorts, the tables of a resumed archive are
+        # completed with the rows parsed since. The energies and radii are stored in the
+        # hartree and bohr of the output.
+        sec_run = self.archive.section_run[0]
+        for n, table in enumerate(self.out_parser.get('atomic_energies', [])):
+            if n < len(sec_run.x_fplo_atomic_energies):
+                sec_energies = sec_run.x_fplo_atomic_energies[n]
+            else:
+                sec_energies = sec_run.m_create(x_fplo_atomic_energies)
+            sec_energies.x_fplo_atomic_energies_relativistic = table['relativistic']
+            sec_energies.x_fplo_atomic_energies_element = table['element']
+            sec_energies.x_fplo_atomic_energies_orbital = table['orbital']
+            sec_energies.x_fplo_atomic_energies_energy = table['energy']
+            sec_energies.x_fplo_atomic_energies_compression_radius = table['compression_radius']
+            sec_energies.x_fplo_atomic_energies_compression_power = table['compression_power']
+            sec_energies.x_fplo_atomic_energies_type = table['type']
+            sec_energies.x_fplo_atomic_energies_sort = table['sort']
+
+        for n, table in enumerate(self.out_parser.get('basis_radius', [])):
+            if n < len(sec_run.x_fplo_basis_radius):
+                sec_radius = sec_run.x_fplo_basis_radius[n]
+            else:
+                sec_radius = sec_run.m_create(x_fplo_basis_radius)
+            sec_radius.x_fplo_basis_radius_element = table['element']
+            sec_radius.x_fplo_basis_radius_orbital = table['orbital']
+            sec_radius.x_fplo_basis_radius_rmin_la = table['rmin_la']
+            sec_radius.x_fplo_basis_radius_rmin_sa = table['rmin_sa']
+            sec_radius.x_fplo_basis_radius_rmin_ld = table['rmin_ld']
+            sec_radius.x_fplo_basis_radius_rmin_sd = table['rmin_sd']
+            sec_radius.x_fplo_basis_radius_type = table['type']
+            sec_radius.x_fplo_basis_radius_sort = table['sort']
+
+    def parse_scf_history(self):
+        # the convergence of all SCF iterations is stored as arrays in the run
+        iteration = self.out_parser.get('scf_iteration')
+        if iteration is None:
+            return
+
+        sec_run = self.archive.section_run[0]
+        sec_run.x_fplo_scf_iteration = np.frombuffer(iteration, dtype=np.int32)
+        sec_run.x_fplo_scf_dimension = np.frombuffer(
+            self.out_parser.get('scf_dimension'), dtype=np.int32)
+        sec_run.x_fplo_scf_deviation_last = np.frombuffer(
+            self.out_parser.get('scf_deviation_last'), dtype=np.float64)
+        sec_run.x_fplo_scf_deviation_new = np.frombuffer(
+            self.out_parser.get('scf_deviation_new'), dtype=np.float64)
+        sec_run.x_fplo_scf_step = np.frombuffer(
+            self.out_parser.get('scf_step'), dtype=np.float64)
+        sec_run.x_fplo_scf_converged = self.out_parser.get('scf_converged')
+
+    def parse_energy(self):
+        # the decomposition of the total energy of all boxes is stored as arrays in the run,
+        # in the hartree of the output
+        energy_total = self.out_parser.get('energy_total')
+        if not energy_total or self.out_parser.final:
+            return
+
+        sec_run = self.archive.section_run[0]
+        sec_run.x_fplo_energy_ee_columns = list(self.out_parser.get('energy_ee_columns'))
+        sec_run.x_fplo_energy_ee = np.frombuffer(
+            self.out_parser.get('energy_ee'), dtype=np.float64).reshape(
+                len(energy_total), -1)
+        sec_run.x_fplo_energy_core = np.frombuffer(
+            self.out_parser.get('energy_core'), dtype=np.float64)
+        sec_run.x_fplo_energy_band = np.frombuffer(
+            self.out_parser.get('energy_band'), dtype=np.float64)
+        sec_run.x_fplo_energy_ts = np.frombuffer(
+            self.out_parser.get('energy_ts'), dtype=np.float64)
+        sec_run.x_fplo_energy_stack = np.frombuffer(
+            self.out_parser.get('energy_stack'), dtype=np.float64)
+        sec_run.x_fplo_energy_stack_size = np.frombuffer(
+            self.out_parser.get('energy_stack_size'), dtype=np.int32)
+        sec_run.x_fplo_energy_average = np.frombuffer(
+            self.out_parser.get('energy_average'), dtype=np.float64)
+        sec_run.x_fplo_energy_average_deviation = np.frombuffer(
+            self.out_parser.get('energy_average_deviation'), dtype=np.float64)
+
+    def parse_fermi_energy(self):
+        # the Fermi energy and electrons of all tetrahedron integrations are stored as
+        # arrays in the run, the energies in the hartree they are printed in. The
+        # integrations are only assigned to their SCF iteration if the iterations are parsed
+        iteration = self.out_parser.get('fermi_iteration')
+        if iteration is None or self.out_parser.final or not self.out_parser.decodes(
+                'scf_iteration'):
+            return
+
+        sec_run = self.archive.section_run[0]
+        sec_run.x_fplo_fermi_iteration = np.frombuffer(iteration, dtype=np.int32)
+        sec_run.x_fplo_fermi_energy = np.array(self.out_parser.get('energy_reference_fermi'))
+        sec_run.x_fplo_fermi_electrons = np.frombuffer(
+            self.out_parser.get('fermi_electrons'), dtype=np.float64)
+
+    def parse_density_analysis(self):
+        # the values of each site in each analysis are stored as arrays of analyses x
+        # sites in the run
+        iteration = self.out_parser.get('density_iteration')
+        if iteration is not None:
+            density = np.frombuffer(
+                self.out_parser.get('density_analysis'), dtype=np.float64).reshape(
+                    len(iteration), -1, 5)
+            sec_run = self.archive.section_run[0]
+            sec_run.x_fplo_density_iteration = np.frombuffer(iteration, dtype=np.int32)
+            sec_run.x_fplo_density_spin_up = density[:, :, 0]
+            sec_run.x_fplo_density_spin_down = density[:, :, 1]
+            sec_run.x_fplo_density_electrons = density[:, :, 2]
+            sec_run.x_fplo_density_nuclear = density[:, :, 3]
+            sec_run.x_fplo_density_excess = density[:, :, 4]
+
+        charge = self.out_parser.get('charge')
+        if charge is not None:
+            charge = np.frombuffer(charge, dtype=np.float64).reshape(-1, 5)
+            sites = np.frombuffer(
+                self.out_parser.get('site_magnetic_moment'), dtype=np.float64).reshape(
+                    len(charge), -1, 2)
+            sec_run = self.archive.section_run[0]
+            sec_run.x_fplo_charge_nuclear = charge[:, 0]
+            sec_run.x_fplo_charge_electronic = charge[:, 1]
+            sec_run.x_fplo_charge_magnetic_moment = charge[:, 2]
+            sec_run.x_fplo_charge_spin_up = charge[:, 3]
+            sec_run.x_fplo_charge_spin_down = charge[:, 4]
+            sec_run.x_fplo_site_magnetic_moment = sites[:, :, 0]
+            sec_run.x_fplo_site_nuclear_charge = sites[:, :, 1]
+
+    def parse_cpu_time(self):
+        steps = self.out_parser.get('cpu_time_steps')
+        if not steps:
+            return
+
+        step = np.frombuffer(self.out_parser.get('cpu_time_step'), dtype=np.int32)
+        iteration = np.frombuffer(self.out_parser.get('cpu_time_iteration'), dtype=np.int32)
+        cpu_time = np.frombuffer(self.out_parser.get('cpu_time'), dtype=np.float64)
+        # the first column is for the steps before the first SCF iteration, steps
+        # reported more than once within an iteration add up
+        table = np.zeros((len(steps), iteration.max() + 2))
+        np.add.at(table, (step, iteration + 1), cpu_time)
+
+        sec_run = self.archive.section_run[0]
+        sec_run.x_fplo_cpu_time_step = steps
+        sec_run.x_fplo_cpu_time = table
+
+    def parse_timing(self):
+        timing = self.out_parser.timing
+        if timing is None:
+            return
+
+        # the work of all parses of a resumed archive adds up
+        sec_run = self.archive.section_run[0]
+        sec_timings = {
+            sec_timing.x_fplo_parser_timing_block: sec_timing
+            for sec_timing in sec_run.x_fplo_parser_timing}
+        for name, block in timing.items():
+            sec_timing = sec_timings.get(name)
+            if sec_timing is None:
+                sec_timing = sec_run.m_create(x_fplo_parser_timing)
+                sec_timing.x_fplo_parser_timing_block = name
+                sec_timing.x_fplo_parser_timing_time = 0.0 * ureg.second
+                sec_timing.x_fplo_parser_timing_bytes = 0
+                sec_timing.x_fplo_parser_timing_matches = 0
+            sec_timing.x_fplo_parser_timing_time += block['time'] * ureg.second
+            sec_timing.x_fplo_parser_timing_bytes += block['bytes']
+            sec_timing.x_fplo_parser_timing_matches += block['matches']
+
+        if self.timing_callback is not None:
+            self.timing_callback(self.filepath, timing)
+
+    def parse_scc(self, start=0):
+        # the n-th total energy and the n-th Fermi energy go to the n-th calculation, the
+        # calculations from start on may already exist with part of their energies. The
+        # Fermi energies estimated within the n-th SCF iteration are also kept in the SCF
+        # iterations of the n-th calculation, one per estimate.
+        if len(self.out_parser.get('energy_reference_fermi', [])) > start:
+            # the SCF iteration is extended by the temporaries of the environment
+            metainfo.load()
+        energy_factor = self.unit_factors['energy']
+        energy_total = np.array(self.out_parser.get('energy_total', [])) * energy_factor
+        # FPLO prints the Fermi energy in hartree, only the legacy energy_reference_fermi
+        # keeps the eV factor
+        energy_fermi = np.array(self.out_parser.get('energy_reference_fermi', []))
+        hartree_factor = ureg.Quantity(1.0, ureg.hartree).to_base_units().magnitude
+        if self.out_parser.final:
+            # only the last estimate of the last calculation is parsed
+            fermi_iteration = np.zeros(len(energy_fermi), dtype=np.int32)
+        elif self.out_parser.decodes('scf_iteration') and len(energy_fermi) > 0:
+            fermi_iteration = np.frombuffer(
+                self.out_parser.get('fermi_iteration'), dtype=np.int32)
+        else:
+            # the estimates are not assigned without the SCF iterations
+            fermi_iteration = np.full(len(energy_fermi), -1, dtype=np.int32)
+        # the estimates of each iteration follow each other
+        n_iterations = fermi_iteration.max() + 1 if len(fermi_iteration) > 0 else 0
+        bounds = np.searchsorted(fermi_iteration, np.arange(n_iterations + 1))
+
+        sec_run = self.archive.section_run[0]
+        sec_sccs = sec_run.section_single_configuration_calculation
+        for n in range(start, max(len(energy_total), len(energy_fermi), n_iterations)):
+            if n < len(sec_sccs):
+                sec_scc = sec_sccs[n]
+            else:
+                sec_scc = sec_run.m_create(SingleConfigurationCalculation)
+            if n < len(energy_total):
+                sec_scc.energy_total = energy_total[n]
+            if n < len(energy_fermi):
+                sec_scc.energy_reference_fermi = energy_fermi[n:n + 1] * energy_factor
+            if n < n_iterations:
+                sec_scfs = sec_scc.section_scf_iteration
+                for k, energy in enumerate(energy_fermi[bounds[n]:bounds[n + 1]]):
+                    sec_scf = sec_scfs[k] if k < len(sec_scfs) else sec_scc.m_create(ScfIteration)
+                    sec_scf.x_fplo_t_energy_reference_fermi_iteration = energy * hartree_factor
+
+    def parse(
+            self, filepath, archive, logger=None, quantities: Iterable[str] = None,
+            header_only=False, tail_only=False):
+        '''
+        Parses the mainfile into the archive. Only the given quantities and sections are
+        parsed, if any, see select_blocks. The blocks of the output they are not parsed
+        from are skipped and the output is only read up to the first SCF iteration if
+        they are all printed before it. With header_only, only the header_quantities are
+        parsed from the first header_size bytes of the output. With tail_only, only the
+        tail_quantities of the final state are parsed from the end of the output, the
+        work does not depend on the number of SCF iterations.
+        '''
+        if not os.path.isfile(filepath):
+            raise FileNotFoundError('No such mainfile: %s' % filepath)
+
+        # the cache is keyed by the content of the whole file, it only holds complete
+        # archives. The timing is that of parsing, instrumented parses bypass it.
+        cache = self.cache
+        if quantities is not None or header_only or tail_only or self.out_parser.instrument:
+            cache = None
+        if cache is not None:
+            key = cache.key(os.path.abspath(filepath))
+            if cache.load(key, archive):
+                return
+
+        self.resume(
+            filepath, ResumeState(archive), logger, quantities, header_only, tail_only,
+            complete=True)
+
+        if cache is not None:
+            cache.save(key, archive)
+
+    def resume(
+            self, filepath, state=None, logger=None, quantities: Iterable[str] = None,
+            header_only=False, tail_only=False, complete=False) -> ResumeState:
+        '''
+        Parses the output written to the mainfile since the state was saved and adds the
+        new calculations to the archive of the state. Returns the state to continue with
+        once more output is written. Only the given quantities are parsed, if any, or the
+        header_quantities with header_only or the tail_quantities with tail_only. Unless
+        complete, the mainfile can still be written and a run without termination is
+        running rather than crashed.
+        '''
+        if not os.path.isfile(filepath):
+            raise FileNotFoundError('No such mainfile: %s' % filepath)
+
+        state = ResumeState(EntryArchive()) if state is None else state
+        self.filepath = os.path.abspath(filepath)
+        self.archive = state.archive
+        self.maindir = os.path.dirname(self.filepath)
+        # the decoders log with structured data, which the logging module does not take
+        self.logger = logger if logger is not None else get_logger(__name__)
+
+        self.init_parser()
+        if header_only:
+            quantities = header_quantities
+        elif tail_only:
+            quantities = tail_quantities
+        selection, final = (None, False) if quantities is None else select_blocks(quantities)
+        self.out_parser.selection = selection
+        self.out_parser.final = final or tail_only
+        self.out_parser.tail = tail_only
+        self.out_parser.limit = self.header_size if header_only else None
+        self.out_parser.resume(state.offset, state.results)
+
+        if self.archive.section_run:
+            sec_run = self.archive.section_run[0]
+        else:
+            sec_run = self.archive.m_create(Run)
+            sec_run.program_name = self.code_name
+        self.parse_header()
+
+        self.parse_status(complete)
+
+        self.parse_input()
+
+        self.parse_system()
+
+        self.parse_symmetry()
+
+        self.parse_basis()
+
+        self.parse_scf_history()
+
+        self.parse_energy()
+
+        self.parse_fermi_energy()
+
+        self.parse_density_analysis()
+
+        self.parse_cpu_time()
+
+        # only the calculations after the complete ones of the state can change
+        self.parse_scc(min(
+            len(state.results.get('energy_total', [])),
+            len(state.results.get('energy_reference_fermi', []))))
+
+        self.parse_timing()
+
+        offset, results = self.out_parser.checkpoint
+        return ResumeState(self.archive, offset, results)
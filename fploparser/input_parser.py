@@ -0,0 +1,270 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD.
+# See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import re
+import numpy as np
+from typing import Any, Dict, List, Tuple
+
+from nomad.parsing.file_parser import FileParser
+
+
+# tokens of the FEDIT format: strings with their quotes, comments, numbers, names,
+# punctuation and any other character
+re_token = re.compile(
+    r'"[^"]*"|#[^\n]*|(?:\d+\.?\d*|\.\d+)(?:[eEdD][+-]?\d+)?|\w+|[{}\[\];,=()+\-*/]|\S')
+
+# the arrays of numbers become numpy arrays of these types
+dtypes = dict(int=np.int32, real=np.float64)
+
+logicals = dict(t=True, true=True, f=False, false=False)
+
+numeric = set('0123456789.')
+
+
+class InputParser(FileParser):
+    '''
+    Parser for the FPLO input file ``=.in`` written by FEDIT. The file consists of
+    sections of C-like declarations with initializers, e.g.
+
+        section name{ struct {int type;char[*] description;} x ={1,"a"}; real y[3]={...}; };
+
+    The tokens of the whole file are matched by a single regular expression and the
+    declarations are parsed by recursive descent in a single pass over the tokens. The values are
+    converted to the declared types: structs become dicts, arrays of structs lists of
+    dicts, arrays of numbers numpy arrays and arrays of flags dicts of booleans. The
+    results are the sections by name.
+
+    Arguments:
+        mainfile: the file to be parsed
+        logger: optional logger
+    '''
+    def __init__(self, mainfile=None, logger=None, **kwargs):
+        super().__init__(mainfile, logger=logger, open=kwargs.get('open', None))
+        self.init_parameters()
+
+    def init_parameters(self):
+        self._text = ''
+        self._tokens: List[str] = []
+        self._n = 0
+
+    def parse(self, key=None):
+        self._results = dict()
+        if self.mainfile is None:
+            return self
+
+        with open(self.mainfile, 'rb') as f:
+            text = f.read().decode('utf-8', errors='replace')
+        self._results.update(self.parse_text(text))
+
+        return self
+
+    def parse_text(self, text: str) -> Dict[str, Any]:
+        '''
+        Returns the sections declared in the content of an ``=.in`` file.
+        '''
+        self._text = text
+        # the kind of a token is told by its first character, the empty token ends the file
+        self._tokens = [token for token in re_token.findall(text) if token[0] != '#']
+        self._tokens.append('')
+        self._n = 0
+
+        try:
+            sections = dict()
+            while self._tokens[self._n]:
+                self._expect('section')
+                name = self._name()
+                self._expect('{')
+                values = dict()
+                while not self._accept('}'):
+                    type_, name_, dims = self._parse_declaration()
+                    self._expect('=')
+                    values[name_] = self._parse_value(type_, dims)
+                    self._expect(';')
+                self._expect(';')
+                sections[name] = values
+        finally:
+            self.init_parameters()
+
+        return sections
+
+    def _error(self, expected: str):
+        # the position of the token is only needed for the message
+        tokens = (match for match in re_token.finditer(self._text) if match.group()[0] != '#')
+        for _ in range(self._n):
+            match = next(tokens)
+        line = self._text.count('\n', 0, match.start()) + 1
+        raise ValueError('line %d: expected %s, found %r' % (line, expected, match.group()))
+
+    def _next(self) -> str:
+        token = self._tokens[self._n]
+        if not token:
+            self._error('more input')
+        self._n += 1
+        return token
+
+    def _accept(self, value: str) -> bool:
+        if self._tokens[self._n] != value:
+            return False
+        self._n += 1
+        return True
+
+    def _expect(self, value: str):
+        if self._next() != value:
+            self._error(repr(value))
+
+    def _name(self) -> str:
+        token = self._next()
+        if not (token[0].isalpha() or token[0] == '_'):
+            self._error('a name')
+        return token
+
+    def _parse_type(self) -> Any:
+        # the type of a struct is the list of its member declarations
+        type_ = self._name()
+        if type_ == 'struct':
+            self._expect('{')
+            members = []
+            while not self._accept('}'):
+                members.append(self._parse_declaration())
+                self._expect(';')
+            return members
+
+        if type_ == 'char':
+            # the length of a string does not matter
+            self._expect('[')
+            self._next()
+            self._expect(']')
+        elif type_ not in ('int', 'real', 'logical', 'flag'):
+            self._error('a type')
+
+        return type_
+
+    def _parse_declaration(self) -> Tuple[Any, str, List[str]]:
+        type_ = self._parse_type()
+        name = self._name()
+        dims = []
+        while self._accept('['):
+            dims.append(self._next())
+            self._expect(']')
+
+        return type_, name, dims
+
+    def _parse_value(self, type_: Any, dims: List[str]) -> Any:
+        if dims:
+            # the number of elements is given by the initializer
+            self._expect('{')
+            values = []
+            if not self._accept('}'):
+                values.append(self._parse_value(type_, dims[1:]))
+                while self._accept(','):
+                    values.append(self._parse_value(type_, dims[1:]))
+                self._expect('}')
+            if type_ == 'flag':
+                return dict(values)
+            if type_ in ('int', 'real'):
+                return np.array(values, dtype=dtypes[type_])
+            return values
+
+        if isinstance(type_, list):
+            self._expect('{')
+            struct = dict()
+            for n, (member_type, name, member_dims) in enumerate(type_):
+                if n > 0:
+                    self._expect(',')
+                struct[name] = self._parse_value(member_type, member_dims)
+            self._expect('}')
+            return struct
+
+        if type_ == 'real':
+            return float(self._parse_expression())
+
+        if type_ == 'int':
+            return int(self._parse_expression())
+
+        if type_ == 'char':
+            value = self._next()
+            if value[0] != '"':
+                self._error('a string')
+            return value[1:-1]
+
+        if type_ == 'logical':
+            logical = logicals.get(self._name().lower())
+            if logical is None:
+                self._error('a logical')
+            return logical
+
+        # a flag is its name followed by (+) if set or (-) if not
+        name = self._name()
+        self._expect('(')
+        value = self._next()
+        if value not in ('+', '-'):
+            self._error('+ or -')
+        self._expect(')')
+        return name, value == '+'
+
+    def _parse_expression(self) -> float:
+        # most values are plain numbers
+        token = self._tokens[self._n]
+        if token[0] in numeric and self._tokens[self._n + 1] in (',', '}', ';'):
+            self._n += 1
+            return self._number(token)
+
+        value = self._parse_term()
+        while True:
+            if self._accept('+'):
+                value += self._parse_term()
+            elif self._accept('-'):
+                value -= self._parse_term()
+            else:
+                return value
+
+    def _parse_term(self) -> float:
+        value = self._parse_factor()
+        while True:
+            if self._accept('*'):
+                value *= self._parse_factor()
+            elif self._accept('/'):
+                value /= self._parse_factor()
+            else:
+                return value
+
+    def _parse_factor(self) -> float:
+        token = self._next()
+        if token[0] in numeric:
+            return self._number(token)
+        if token == '-':
+            return -self._parse_factor()
+        if token == '+':
+            return self._parse_factor()
+        if token == '(':
+            value = self._parse_expression()
+            self._expect(')')
+            return value
+        self._error('a number')
+        return 0
+
+    def _number(self, token: str) -> float:
+        if token.isdigit():
+            return int(token)
+        try:
+            # exponents can be written as in Fortran
+            return float(token.replace('d', 'e').replace('D', 'e'))
+        except ValueError:
+            self._error('a number')
+            return 0
@@ -16,20 +16,187 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import os
 import sys
-from nomad.metainfo import Environment
-from nomad.metainfo.legacy import LegacyMetainfoEnvironment
-import fploparser.metainfo.fplo
-import nomad.datamodel.metainfo.common
-import nomad.datamodel.metainfo.public
-import nomad.datamodel.metainfo.general
-import fploparser.metainfo.fplo_temporaries
-import fploparser.metainfo.fplo_input_autogenerated
-
-m_env = LegacyMetainfoEnvironment()
-m_env.m_add_sub_section(Environment.packages, sys.modules['fploparser.metainfo.fplo'].m_package)  # type: ignore
-m_env.m_add_sub_section(Environment.packages, sys.modules['nomad.datamodel.metainfo.common'].m_package)  # type: ignore
-m_env.m_add_sub_section(Environment.packages, sys.modules['nomad.datamodel.metainfo.public'].m_package)  # type: ignore
-m_env.m_add_sub_section(Environment.packages, sys.modules['nomad.datamodel.metainfo.general'].m_package)  # type: ignore
-m_env.m_add_sub_section(Environment.packages, sys.modules['fploparser.metainfo.fplo_temporaries'].m_package)  # type: ignore
-m_env.m_add_sub_section(Environment.packages, sys.modules['fploparser.metainfo.fplo_input_autogenerated'].m_package)  # type: ignore
+import builtins
+import json
+import hashlib
+import tempfile
+import importlib
+import numpy as np
+from typing import Any, Dict, Type
+
+# the modules of the packages of the environment, the modules of this package are only
+# imported on first use, e.g. the input metainfo is not needed for matching mainfiles
+packages = [
+    'fploparser.metainfo.fplo',
+    'nomad.datamodel.metainfo.common',
+    'nomad.datamodel.metainfo.public',
+    'nomad.datamodel.metainfo.general',
+    'fploparser.metainfo.fplo_temporaries',
+    'fploparser.metainfo.fplo_input_autogenerated']
+
+# the packages that are only loaded with the environment, their definitions are cached
+# serialized, loading these is faster than executing their modules
+cached_packages = [
+    'fploparser.metainfo.fplo_temporaries',
+    'fploparser.metainfo.fplo_input_autogenerated']
+
+# the directory of the cache, FPLO_METAINFO_CACHE overrides the user's cache directory
+cache_directory = os.environ.get('FPLO_METAINFO_CACHE', os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+    'fploparser'))
+
+_m_env = None
+_packages: Dict[str, Any] = dict()
+
+
+def _cache_prefix() -> str:
+    # the installs of the parser share the user's cache directory, the files of an install
+    # are prefixed by a digest of its location
+    location = os.path.dirname(os.path.abspath(__file__))
+    return 'metainfo-%s-' % hashlib.sha256(location.encode()).hexdigest()[:8]
+
+
+def cache_path() -> str:
+    '''
+    The file of the serialized packages. It is keyed by the install and the version of
+    the parser and of nomad, whose definitions the packages extend.
+    '''
+    from nomad import config
+    from ..cache import parser_version
+
+    return os.path.join(cache_directory, '%s%s-%s.json' % (
+        _cache_prefix(), parser_version()[:16], config.meta.version))
+
+
+def _read_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _from_dict(data):
+    # the types of the quantities are serialized, but not deserialized by the metainfo,
+    # the sections are not validated, as the sections of the modules
+    from nomad.metainfo import Package, Section, Quantity, MEnum
+
+    package = Package.m_from_dict(data)
+    for definition in package.m_all_contents():
+        if isinstance(definition, Section):
+            definition.validate = False
+        elif isinstance(definition, Quantity) and isinstance(definition.type, dict):
+            kind, type_data = definition.type['type_kind'], definition.type.get('type_data')
+            if kind == 'python':
+                definition.type = getattr(builtins, type_data)
+            elif kind == 'numpy':
+                definition.type = np.dtype(type_data)
+            elif kind == 'Enum':
+                definition.type = MEnum(*type_data)
+            else:
+                raise ValueError('Cannot deserialize the type of %s' % definition.name)
+
+    return package
+
+
+def _write_cache(path, m_env):
+    # references to the definitions of other packages are paths in the environment, the
+    # packages are stored at their position in it
+    from nomad.metainfo import Environment
+
+    serialized = [
+        package.m_to_dict() if name in cached_packages else None
+        for name, package in zip(packages, m_env.m_get_sub_sections(Environment.packages))]
+    try:
+        os.makedirs(cache_directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(dict(packages=serialized), f)
+        os.replace(tmp_path, path)
+        # the caches of other versions of this install are stale, those of other installs
+        # are left to them
+        prefix = _cache_prefix()
+        for name in os.listdir(cache_directory):
+            if name.startswith(prefix) and name != os.path.basename(path):
+                os.remove(os.path.join(cache_directory, name))
+    except OSError:
+        pass
+
+
+def load():
+    '''
+    Returns the metainfo environment with all packages, it is built on first use. The
+    cached packages are loaded from their serialization unless their modules are already
+    imported. Without a cache, the modules are imported and the cache is written.
+    '''
+    global _m_env
+    if _m_env is not None:
+        return _m_env
+
+    from nomad.metainfo import Environment, Section, SubSection
+    from nomad.metainfo.legacy import LegacyMetainfoEnvironment
+
+    path = cache_path()
+    cache = None
+    if not any(name in sys.modules for name in cached_packages):
+        cache = _read_cache(path)
+
+    loaded = dict()
+    if cache is not None:
+        try:
+            for n, name in enumerate(packages):
+                if name in cached_packages:
+                    loaded[name] = _from_dict(cache['packages'][n])
+        except Exception:
+            # the modules are imported instead of an incompatible cache
+            loaded, cache = dict(), None
+
+    m_env = LegacyMetainfoEnvironment()
+    for name in packages:
+        package = loaded.get(name)
+        if package is None:
+            package = importlib.import_module(name).m_package  # type: ignore
+        _packages[name] = package
+        m_env.m_add_sub_section(Environment.packages, package)
+
+    # the references of the loaded packages are resolved once all packages are in the
+    # environment, the definitions refer to the resolved sections and not their proxies
+    for package in loaded.values():
+        for definition in package.m_all_contents():
+            if isinstance(definition, Section) and definition.base_sections:
+                definition.base_sections = [
+                    base_section.m_resolved() for base_section in definition.base_sections]
+            elif isinstance(definition, SubSection):
+                definition.sub_section = definition.sub_section.m_resolved()
+        package.init_metainfo()
+
+    if cache is None:
+        _write_cache(path, m_env)
+
+    _m_env = m_env
+    return _m_env
+
+
+def section_cls(name: str) -> Type[Any]:
+    '''
+    Returns the class of the section definition with the given name from the cached
+    packages. Their classes are used instead of those of the modules, which are not
+    imported if the packages were loaded from the cache.
+    '''
+    load()
+    for package_name in cached_packages:
+        definition = _packages[package_name].all_definitions.get(name)
+        if definition is not None:
+            return definition.section_cls
+
+    raise KeyError('Could not resolve %s' % name)
+
+
+def __getattr__(name):
+    # the environment is built on first access of the attribute
+    if name == 'm_env':
+        return load()
+
+    raise AttributeError('module %s has no attribute %s' % (__name__, name))
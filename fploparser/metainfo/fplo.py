@@ -33,10 +33,325 @@ m_package = Package(
     a_legacy=LegacyDefinition(name='fplo.nomadmetainfo.json'))
 
 
+class x_fplo_parser_timing(MSection):
+    '''
+    Work of the parser on one kind of block of the FPLO output
+    '''
+
+    m_def = Section(validate=False, a_legacy=LegacyDefinition(name='x_fplo_parser_timing'))
+
+    x_fplo_parser_timing_block = Quantity(
+        type=str,
+        shape=[],
+        description='''
+        Name of the block, markers for the work of locating all blocks
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_parser_timing_block'))
+
+    x_fplo_parser_timing_time = Quantity(
+        type=np.dtype(np.float64),
+        shape=[],
+        unit='second',
+        description='''
+        Wall time spent on the block
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_parser_timing_time'))
+
+    x_fplo_parser_timing_bytes = Quantity(
+        type=np.dtype(np.int64),
+        shape=[],
+        description='''
+        Number of bytes scanned for the block
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_parser_timing_bytes'))
+
+    x_fplo_parser_timing_matches = Quantity(
+        type=np.dtype(np.int32),
+        shape=[],
+        description='''
+        Number of times the block was matched
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_parser_timing_matches'))
+
+
+class x_fplo_atomic_energies(MSection):
+    '''
+    Table of the RELATIVISTIC or SCALARRELATIVISTIC ATOMIC ENERGIES, one row per state
+    of each sort
+    '''
+
+    m_def = Section(validate=False, a_legacy=LegacyDefinition(name='x_fplo_atomic_energies'))
+
+    x_fplo_atomic_energies_relativistic = Quantity(
+        type=bool,
+        shape=[],
+        description='''
+        Whether the energies are the RELATIVISTIC (true) or the SCALARRELATIVISTIC ones
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_atomic_energies_relativistic'))
+
+    x_fplo_atomic_energies_element = Quantity(
+        type=str,
+        shape=['*'],
+        description='''
+        Element of each state
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_atomic_energies_element'))
+
+    x_fplo_atomic_energies_orbital = Quantity(
+        type=str,
+        shape=['*'],
+        description='''
+        Orbital of each state, e.g. 3d or 3d 5/2
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_atomic_energies_orbital'))
+
+    x_fplo_atomic_energies_energy = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        unit='hartree',
+        description='''
+        Atomic energy of each state
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_atomic_energies_energy'))
+
+    x_fplo_atomic_energies_compression_radius = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        unit='bohr',
+        description='''
+        Radius of the compression of each state, NaN if not compressed
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_atomic_energies_compression_radius'))
+
+    x_fplo_atomic_energies_compression_power = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        description='''
+        Power of the compression of each state, NaN if not compressed
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_atomic_energies_compression_power'))
+
+    x_fplo_atomic_energies_type = Quantity(
+        type=str,
+        shape=['*'],
+        description='''
+        Type of each state, core or valence
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_atomic_energies_type'))
+
+    x_fplo_atomic_energies_sort = Quantity(
+        type=np.dtype(np.int32),
+        shape=['*'],
+        description='''
+        Sort of each state
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_atomic_energies_sort'))
+
+
+class x_fplo_basis_radius(MSection):
+    '''
+    Table of the MINIMAL RADIUS FOR THE LOCAL BASIS FUNCTIONS, one row per state of each
+    sort. The rows of the maxima over the core and valence states are not included.
+    '''
+
+    m_def = Section(validate=False, a_legacy=LegacyDefinition(name='x_fplo_basis_radius'))
+
+    x_fplo_basis_radius_element = Quantity(
+        type=str,
+        shape=['*'],
+        description='''
+        Element of each state
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_basis_radius_element'))
+
+    x_fplo_basis_radius_orbital = Quantity(
+        type=str,
+        shape=['*'],
+        description='''
+        Orbital of each state
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_basis_radius_orbital'))
+
+    x_fplo_basis_radius_rmin_la = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        unit='bohr',
+        description='''
+        RMIN_LA of each state
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_basis_radius_rmin_la'))
+
+    x_fplo_basis_radius_rmin_sa = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        unit='bohr',
+        description='''
+        RMIN_SA of each state
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_basis_radius_rmin_sa'))
+
+    x_fplo_basis_radius_rmin_ld = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        unit='bohr',
+        description='''
+        RMIN_LD of each state
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_basis_radius_rmin_ld'))
+
+    x_fplo_basis_radius_rmin_sd = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        unit='bohr',
+        description='''
+        RMIN_SD of each state
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_basis_radius_rmin_sd'))
+
+    x_fplo_basis_radius_type = Quantity(
+        type=str,
+        shape=['*'],
+        description='''
+        Type of each state, Core or Valence
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_basis_radius_type'))
+
+    x_fplo_basis_radius_sort = Quantity(
+        type=np.dtype(np.int32),
+        shape=['*'],
+        description='''
+        Sort of each state
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_basis_radius_sort'))
+
+
+class x_fplo_symmetry(MSection):
+    '''
+    Symmetry group of the crystal structure and its operations as created by FPLO
+    '''
+
+    m_def = Section(validate=False, a_legacy=LegacyDefinition(name='x_fplo_symmetry'))
+
+    x_fplo_symmetry_space_group_number = Quantity(
+        type=np.dtype(np.int32),
+        shape=[],
+        description='''
+        Number of the space group
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_symmetry_space_group_number'))
+
+    x_fplo_symmetry_space_group_symbol = Quantity(
+        type=str,
+        shape=[],
+        description='''
+        Symbol of the space group, it tells the setting
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_symmetry_space_group_symbol'))
+
+    x_fplo_symmetry_point_group_number = Quantity(
+        type=np.dtype(np.int32),
+        shape=[],
+        description='''
+        Number of the point group
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_symmetry_point_group_number'))
+
+    x_fplo_symmetry_point_group_symbol = Quantity(
+        type=str,
+        shape=[],
+        description='''
+        Symbol of the point group
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_symmetry_point_group_symbol'))
+
+    x_fplo_symmetry_inversion = Quantity(
+        type=bool,
+        shape=[],
+        description='''
+        Whether the group contains the inversion
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_symmetry_inversion'))
+
+    x_fplo_symmetry_symmorphic = Quantity(
+        type=bool,
+        shape=[],
+        description='''
+        Whether the space group is symmorphic
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_symmetry_symmorphic'))
+
+    x_fplo_symmetry_generators = Quantity(
+        type=np.dtype(np.int32),
+        shape=['*'],
+        description='''
+        Indices (see x_fplo_symmetry_operation_index) of the generators of the group
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_symmetry_generators'))
+
+    x_fplo_symmetry_operation_index = Quantity(
+        type=np.dtype(np.int32),
+        shape=['*'],
+        description='''
+        FPLO index of each operation of the group
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_symmetry_operation_index'))
+
+    x_fplo_symmetry_operation_symbol = Quantity(
+        type=str,
+        shape=['*'],
+        description='''
+        Symbol of each operation of the group, e.g. C1/6(z)
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_symmetry_operation_symbol'))
+
+    x_fplo_symmetry_rotation = Quantity(
+        type=np.dtype(np.int32),
+        shape=['*', 3, 3],
+        description='''
+        Rotation matrix of each operation relative to the lattice basis vectors, the
+        rows give the coefficients of X, Y, Z of each transformed coordinate
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_symmetry_rotation'))
+
+    x_fplo_symmetry_translation_numerator = Quantity(
+        type=np.dtype(np.int32),
+        shape=['*', 3],
+        description='''
+        Numerators of the fractional translation of each operation relative to the
+        lattice basis vectors
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_symmetry_translation_numerator'))
+
+    x_fplo_symmetry_translation_denominator = Quantity(
+        type=np.dtype(np.int32),
+        shape=['*', 3],
+        description='''
+        Denominators of the fractional translation of each operation relative to the
+        lattice basis vectors
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_symmetry_translation_denominator'))
+
+
 class section_run(public.section_run):
 
     m_def = Section(validate=False, extends_base_section=True, a_legacy=LegacyDefinition(name='section_run'))
 
+    x_fplo_parser_timing = SubSection(
+        sub_section=SectionProxy('x_fplo_parser_timing'),
+        repeats=True,
+        a_legacy=LegacyDefinition(name='x_fplo_parser_timing'))
+
+    x_fplo_atomic_energies = SubSection(
+        sub_section=SectionProxy('x_fplo_atomic_energies'),
+        repeats=True,
+        a_legacy=LegacyDefinition(name='x_fplo_atomic_energies'))
+
+    x_fplo_basis_radius = SubSection(
+        sub_section=SectionProxy('x_fplo_basis_radius'),
+        repeats=True,
+        a_legacy=LegacyDefinition(name='x_fplo_basis_radius'))
+
     x_fplo_program_version_sub = Quantity(
         type=str,
         shape=[],
@@ -45,6 +360,31 @@ class section_run(public.section_run):
         ''',
         a_legacy=LegacyDefinition(name='x_fplo_program_version_sub'))
 
+    x_fplo_compound = Quantity(
+        type=str,
+        shape=[],
+        description='''
+        Name of the compound given in the input
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_compound'))
+
+    x_fplo_job_id = Quantity(
+        type=str,
+        shape=[],
+        description='''
+        Id of the PBS job of the run
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_job_id'))
+
+    x_fplo_run_status = Quantity(
+        type=str,
+        shape=[],
+        description='''
+        Status of the run: converged or not converged if the SCF calculation finished,
+        crashed if the output ends before it finished or running if it is still written
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_run_status'))
+
     x_fplo_program_compilation_options = Quantity(
         type=str,
         shape=[],
@@ -53,11 +393,311 @@ class section_run(public.section_run):
         ''',
         a_legacy=LegacyDefinition(name='x_fplo_program_compilation_options'))
 
+    x_fplo_scf_iteration = Quantity(
+        type=np.dtype(np.int32),
+        shape=['*'],
+        description='''
+        Number of each SCF iteration as printed by FPLO
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_scf_iteration'))
+
+    x_fplo_scf_dimension = Quantity(
+        type=np.dtype(np.int32),
+        shape=['*'],
+        description='''
+        Dimension of the hyperspace of the density mixing in each SCF iteration
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_scf_dimension'))
+
+    x_fplo_scf_deviation_last = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        description='''
+        Deviation u of the density of the last SCF iteration, as printed at the start of
+        each SCF iteration
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_scf_deviation_last'))
+
+    x_fplo_scf_deviation_new = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        description='''
+        Interpolated new deviation u of the density in each SCF iteration, NaN if not
+        printed
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_scf_deviation_new'))
+
+    x_fplo_scf_step = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        description='''
+        Mixing step p of each SCF iteration, NaN if not printed
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_scf_step'))
+
+    x_fplo_scf_converged = Quantity(
+        type=bool,
+        shape=[],
+        description='''
+        Whether the last SCF iteration is marked as CONVERGED
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_scf_converged'))
+
+    x_fplo_cpu_time_step = Quantity(
+        type=str,
+        shape=['*'],
+        description='''
+        Names of the steps FPLO reports the CPU time of, in the order of their first
+        appearance
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_cpu_time_step'))
+
+    x_fplo_cpu_time = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*', '*'],
+        unit='second',
+        description='''
+        CPU time of each step (first index, see x_fplo_cpu_time_step) in each SCF
+        iteration (second index). The first column holds the CPU time of the steps before
+        the first SCF iteration, the others follow x_fplo_scf_iteration.
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_cpu_time'))
+
+    x_fplo_density_iteration = Quantity(
+        type=np.dtype(np.int32),
+        shape=['*'],
+        description='''
+        Index of the SCF iteration (see x_fplo_scf_iteration) of each Density Analysis,
+        -1 before the first. The density is analysed after mixing and after the
+        Kohn-Sham step of each SCF iteration.
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_density_iteration'))
+
+    x_fplo_density_spin_up = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*', '*'],
+        description='''
+        Spin up electrons of each site (second index) in each Density Analysis (first
+        index)
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_density_spin_up'))
+
+    x_fplo_density_spin_down = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*', '*'],
+        description='''
+        Spin down electrons of each site (second index) in each Density Analysis (first
+        index)
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_density_spin_down'))
+
+    x_fplo_density_electrons = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*', '*'],
+        description='''
+        Electrons of each site (second index) in each Density Analysis (first index)
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_density_electrons'))
+
+    x_fplo_density_nuclear = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*', '*'],
+        description='''
+        Nuclear charge (protons) of each site (second index) in each Density Analysis
+        (first index)
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_density_nuclear'))
+
+    x_fplo_density_excess = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*', '*'],
+        description='''
+        Excess electrons of each site (second index) in each Density Analysis (first
+        index)
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_density_excess'))
+
+    x_fplo_charge_nuclear = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        description='''
+        Total nuclear charge of the CHARGE box following each Density Analysis
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_charge_nuclear'))
+
+    x_fplo_charge_electronic = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        description='''
+        Total electronic charge of the CHARGE box following each Density Analysis
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_charge_electronic'))
+
+    x_fplo_charge_magnetic_moment = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        unit='bohr_magneton',
+        description='''
+        Total magnetic moment of the CHARGE box following each Density Analysis
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_charge_magnetic_moment'))
+
+    x_fplo_charge_spin_up = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        description='''
+        Total spin up electrons of the CHARGE box following each Density Analysis
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_charge_spin_up'))
+
+    x_fplo_charge_spin_down = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        description='''
+        Total spin down electrons of the CHARGE box following each Density Analysis
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_charge_spin_down'))
+
+    x_fplo_site_magnetic_moment = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*', '*'],
+        unit='bohr_magneton',
+        description='''
+        Magnetic moment of each site (second index) in the CHARGE box following each
+        Density Analysis (first index)
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_site_magnetic_moment'))
+
+    x_fplo_site_nuclear_charge = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*', '*'],
+        description='''
+        Nuclear charge of each site (second index) in the CHARGE box following each
+        Density Analysis (first index)
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_site_nuclear_charge'))
+
+    x_fplo_fermi_iteration = Quantity(
+        type=np.dtype(np.int32),
+        shape=['*'],
+        description='''
+        Index of the SCF iteration (see x_fplo_scf_iteration) of each Fermi energy, -1
+        before the first
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_fermi_iteration'))
+
+    x_fplo_fermi_energy = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        unit='hartree',
+        description='''
+        Fermi energy of each tetrahedron integration (TETWTS)
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_fermi_energy'))
+
+    x_fplo_fermi_electrons = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        description='''
+        Number of electrons up to the Fermi energy of each tetrahedron integration
+        (TETWTS)
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_fermi_electrons'))
+
+    x_fplo_energy_ee_columns = Quantity(
+        type=str,
+        shape=['*'],
+        description='''
+        Names of the columns of the EE: line, total, kinetic, potential and
+        exchange-correlation energy followed by the corrections, e.g. LSAD+U energy
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_energy_ee_columns'))
+
+    x_fplo_energy_ee = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*', '*'],
+        unit='hartree',
+        description='''
+        Energies of each column (second index, see x_fplo_energy_ee_columns) of the EE:
+        line of each TOTAL ENERGY box (first index)
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_energy_ee'))
+
+    x_fplo_energy_core = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        unit='hartree',
+        description='''
+        Core energy (Ecore) of each TOTAL ENERGY box
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_energy_core'))
+
+    x_fplo_energy_band = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        unit='hartree',
+        description='''
+        Band energy (EBand) of each TOTAL ENERGY box
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_energy_band'))
+
+    x_fplo_energy_ts = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        unit='hartree',
+        description='''
+        Electronic entropy contribution (T*S) of each TOTAL ENERGY box
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_energy_ts'))
+
+    x_fplo_energy_stack = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        unit='hartree',
+        description='''
+        Last total energy put on the stack of the energies of the previous iterations
+        (estack) in each TOTAL ENERGY box. The stack is collapsed to its new entry, the
+        other entries are those of the previous boxes.
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_energy_stack'))
+
+    x_fplo_energy_stack_size = Quantity(
+        type=np.dtype(np.int32),
+        shape=['*'],
+        description='''
+        Number of entries of the stack of total energies in each TOTAL ENERGY box
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_energy_stack_size'))
+
+    x_fplo_energy_average = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        unit='hartree',
+        description='''
+        Average of the stack of total energies (eav) in each TOTAL ENERGY box
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_energy_average'))
+
+    x_fplo_energy_average_deviation = Quantity(
+        type=np.dtype(np.float64),
+        shape=['*'],
+        unit='hartree',
+        description='''
+        Deviation of the stack of total energies from their average (deav) in each
+        TOTAL ENERGY box
+        ''',
+        a_legacy=LegacyDefinition(name='x_fplo_energy_average_deviation'))
+
 
 class section_system(public.section_system):
 
     m_def = Section(validate=False, extends_base_section=True, a_legacy=LegacyDefinition(name='section_system'))
 
+    x_fplo_symmetry = SubSection(
+        sub_section=SectionProxy('x_fplo_symmetry'),
+        repeats=False,
+        a_legacy=LegacyDefinition(name='x_fplo_symmetry'))
+
     x_fplo_reciprocal_cell = Quantity(
         type=np.dtype(np.float64),
         shape=[3, 3],
@@ -0,0 +1,962 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD.
+# See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import re
+import sys
+import time
+import mmap
+import gzip
+import bz2
+import lzma
+import numpy as np
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, Tuple
+
+from nomad.parsing.file_parser import FileParser
+
+
+# magic numbers of the compressed files and how to open them
+compressions = {
+    b'\x1f\x8b\x08': ('gz', gzip.open),
+    b'\x42\x5a\x68': ('bz2', bz2.open),
+    b'\xfd\x37\x7a': ('xz', lzma.open)}
+
+
+def fixed_width(columns: Dict[str, Tuple[int, int]], width: int) -> np.dtype:
+    '''
+    Returns the dtype of the rows of a table printed with fixed width. The columns are
+    given by their start and end byte in a row, they can overlap.
+    '''
+    return np.dtype(dict(
+        names=list(columns), formats=['S%d' % (end - start) for start, end in columns.values()],
+        offsets=[start for start, _ in columns.values()], itemsize=width))
+
+
+# the rows of the tables of the atomic energies and of the minimal radii of the basis
+# functions, the compression is either none or its radius and power
+atomic_energies_row = fixed_width(dict(
+    element=(1, 9), orbital=(9, 20), energy=(20, 38), compression=(38, 53),
+    compression_radius=(38, 46), compression_power=(46, 53), type=(53, 62),
+    sort=(62, 71)), 72)
+basis_radius_row = fixed_width(dict(
+    element=(1, 6), orbital=(6, 18), rmin_la=(18, 28), rmin_sa=(28, 37), rmin_ld=(37, 47),
+    rmin_sd=(47, 56), type=(56, 66), sort=(66, 71)), 72)
+
+
+def strings(column: np.ndarray) -> List[str]:
+    return np.char.strip(column).astype(str).tolist()
+
+
+# the symmetry operations decoded from a SYMMETRY CREATION block, shared by all files of
+# the process. Keyed by the space group number and symbol and the table of operations as
+# printed, the symbol alone does not tell the origin of the setting.
+symmetry_cache: Dict[Tuple[int, str, bytes], Dict[str, Any]] = dict()
+
+re_symmetry_operation = re.compile(
+    rb'^[ \t]*(\d+):[ \t]*\(([^)]*)\)[ \t]*\+[ \t]*\(([^)]*)\)[ \t]*:[ \t]*(\S+)', re.M)
+# the terms of the rotation, e.g. -X+Y, and the separators of its rows
+re_symmetry_term = re.compile(rb'([+-]?)(\d*)([XYZ])|,')
+re_symmetry_fraction = re.compile(rb'([+-]?\d+)(?:/(\d+))?')
+
+
+def decode_symmetry_operations(table: bytes) -> Dict[str, Any]:
+    '''
+    Decodes the operations (A,B,C)+(t1,t2,t3) of a group into integer rotation matrices
+    and rational translations relative to the lattice basis vectors. The arrays are read
+    only as they are shared through the cache.
+    '''
+    operations = re_symmetry_operation.findall(table)
+    n_operations = len(operations)
+    # the rows of all rotations joined by commas, one coefficient per term
+    terms = np.array(re_symmetry_term.findall(b','.join(
+        rotation for _, rotation, _, _ in operations)), dtype=bytes).reshape(-1, 3)
+    separators = terms[:, 2] == b''
+    row = np.cumsum(separators)[~separators]
+    terms = terms[~separators]
+    coefficients = np.where(terms[:, 1] == b'', b'1', terms[:, 1]).astype(np.int32)
+    coefficients[terms[:, 0] == b'-'] *= -1
+    column = np.searchsorted([b'X', b'Y', b'Z'], terms[:, 2])
+    rotation = np.zeros(n_operations * 9, dtype=np.int32)
+    np.add.at(rotation, row * 3 + column, coefficients)
+
+    fractions = np.array(re_symmetry_fraction.findall(b','.join(
+        translation for _, _, translation, _ in operations)), dtype=bytes).reshape(-1, 2)
+    numerator = fractions[:, 0].astype(np.int32)
+    denominator = np.where(fractions[:, 1] == b'', b'1', fractions[:, 1]).astype(np.int32)
+
+    symmetry = dict(
+        operation_index=np.array([index for index, _, _, _ in operations], dtype=np.int32),
+        operation_symbol=[symbol.decode() for _, _, _, symbol in operations],
+        rotation=rotation.reshape(n_operations, 3, 3),
+        translation_numerator=numerator.reshape(n_operations, 3),
+        translation_denominator=denominator.reshape(n_operations, 3))
+    for value in symmetry.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+
+    return symmetry
+
+
+def reverse_lines(f, start: int, end: int, block_size: int = 1 << 16) -> Iterator[bytes]:
+    '''
+    Yields the lines of the binary file between the byte offsets start and end from the
+    last to the first, with their line breaks. The file is read backwards in blocks.
+    '''
+    position, rest = end, b''
+    while position > start:
+        block_start = max(start, position - block_size)
+        f.seek(block_start)
+        block = f.read(position - block_start) + rest
+        position = block_start
+        line_end = len(block)
+        line_start = block.rfind(b'\n', 0, line_end - 1) + 1
+        while line_start > 0:
+            yield block[line_start:line_end]
+            line_end = line_start
+            line_start = block.rfind(b'\n', 0, line_end - 1) + 1
+        # the first line can begin in the block before
+        rest = block[:line_end]
+    if rest:
+        yield rest
+
+
+class BlockIndex:
+    '''
+    Byte offsets of the blocks printed by FPLO in the order they appear in the file. Each
+    block spans from its marker line up to the next marker or the end of the block,
+    whatever comes first. The offsets are kept in typed arrays.
+
+    Arguments:
+        names: the names of the blocks that can be indexed
+    '''
+    def __init__(self, names: List[str]):
+        self._names = list(names)
+        self._codes = {name: code for code, name in enumerate(self._names)}
+        self._blocks = array('B')
+        self._starts = array('q')
+        self._ends = array('q')
+
+    def append(self, name: str, start: int, end: int):
+        self._blocks.append(self._codes[name])
+        self._starts.append(start)
+        self._ends.append(end)
+
+    def get(self, name: str) -> List[Tuple[int, int]]:
+        '''
+        Returns the (start, end) byte offsets of all blocks with the given name.
+        '''
+        code = self._codes[name]
+        return [
+            (self._starts[n], self._ends[n]) for n, block in enumerate(self._blocks)
+            if block == code]
+
+    @property
+    def names(self) -> List[str]:
+        return [self._names[block] for block in self._blocks]
+
+    @property
+    def spans(self) -> List[Tuple[int, int]]:
+        return list(zip(self._starts, self._ends))
+
+    def __len__(self):
+        return len(self._blocks)
+
+
+class OutParser(FileParser):
+    '''
+    Single-pass parser for the FPLO ``out`` file. The blocks of the file are located by
+    their marker lines and indexed by byte offset, the decoder of a block only sees the
+    bounded window of the block. Matching is done on bytes, only the slices that become
+    quantities are decoded.
+
+    Parsing can start at a byte offset with the results parsed up to it, the checkpoint
+    after parsing gives the offset of the last complete SCF iteration to resume from.
+
+    With a memory-mapped file, the index is built by a fast search for the keyword of
+    each marker in the map and the windows are sliced from it. Otherwise the file is
+    streamed line by line, each line is dispatched on the marker it starts with and the
+    lines of the current block are collected into its window. Compressed files are
+    always streamed, they are decompressed on the fly.
+
+    Arguments:
+        mainfile: the file to be parsed
+        logger: optional logger
+        use_mmap: memory-map the file instead of reading it through a buffered stream
+        instrument: record the wall time, the bytes scanned and the matches of each block
+        selection: the names of the blocks to decode, all by default. The other blocks
+            are not located, unless they are SCF iterations or the termination. Only
+            the header is read if no block after it is selected.
+        final: only decode the last of the selected blocks after the header. The mapped
+            file is searched backwards for them.
+        tail: only decode the last of the selected blocks, the file is read backwards from
+            its end until they are all decoded or the SCF iteration before the last one is
+            reached. Header blocks are not read. Compressed files are streamed as if final.
+        limit: the number of bytes at the start of the file that are read at most
+    '''
+    # block name, keyword contained in the marker line, pattern of the marker line and
+    # pattern of the first line after the block. Without the latter, the block extends
+    # up to the next marker.
+    blocks = [
+        ('job_id', 'PBS-JOB-ID', r'PBS\-JOB\-ID was', r''),
+        ('program_version', 'main version', r'\|[ \t]*main version\:', r'\-'),
+        ('run_info', '| date', r'\|[ \t]*date[ \t]*\:', r'\-'),
+        ('compound', 'Compound:', r'Compound\:', r''),
+        ('input_start', 'Start: content', r'Start\: content of \=\.in', None),
+        ('input_end', 'End  : content', r'End  \: content of \=\.in', None),
+        ('lattice_vectors', 'lattice vectors', r'lattice vectors', r'[ \t]*rec'),
+        ('atom_sites', 'CPA-Block', r'No\. *Element WPS CPA\-Block', r'[ \t\r]*$'),
+        ('symmetry', 'SYMMETRY CREATION', r'[ \t]*SYMMETRY CREATION', r'[ \t]*TRANSLATION'),
+        ('atomic_energies', 'ATOMIC ENERGIES', r'=+[ \t]*(?:SCALAR)?RELATIVISTIC ATOMIC ENERGIES[ \t]*=+', r'[^\|\-]'),
+        ('basis_radius', 'MINIMAL RADIUS', r'\|[ \t]*MINIMAL RADIUS FOR THE LOCAL BASIS FUNCTIONS', r'[^\|\-]|\|[ \t]*max extension'),
+        ('scf_iteration', 'SCF: iteration', r'SCF\: iteration', r'(?!SCF\:[ \t]+interpolated)'),
+        ('density_analysis', 'Density Analysis', r'[ \t]*Density Analysis', r'[ \t\r]*$'),
+        ('charge', 'CHARGE', r'=+[ \t]*CHARGE[ \t]*=+', r'[^\s\|\-]'),
+        ('fermi_energy', 'Fermi energy:', r'[ \t]*(?:\w+\:[ \t]*)?Fermi energy\:', r''),
+        ('total_energy', 'TOTAL ENERGY', r'=+[ \t]*TOTAL ENERGY[ \t]*=+', r'[ \t]*CPU[ \t]*\:'),
+        ('cpu_time', 'cpu time:', r'[ \t]*CPU[ \t]*\:.*cpu time\:', r''),
+        ('termination', 'TERMINATION:', r'TERMINATION\:', None)]
+    # the blocks printed before the first SCF iteration
+    header_blocks = {
+        'job_id', 'program_version', 'run_info', 'compound', 'input_start', 'input_end', 'lattice_vectors', 'atom_sites',
+        'symmetry', 'atomic_energies', 'basis_radius'}
+    # the blocks that are always indexed, the SCF iterations are the checkpoints
+    indexed_blocks = {'scf_iteration', 'termination'}
+    # the blocks of the final state of the run, printed at its end
+    tail_blocks = {'scf_iteration', 'fermi_energy', 'total_energy', 'termination'}
+
+    def __init__(
+            self, mainfile=None, logger=None, use_mmap=True, instrument=False,
+            selection: Iterable[str] = None, final=False, limit: int = None, tail=False,
+            **kwargs):
+        super().__init__(mainfile, logger=logger, open=kwargs.get('open', None))
+        self.use_mmap = use_mmap
+        self.instrument = instrument
+        self.selection = selection
+        self.final = final
+        self.limit = limit
+        self.tail = tail
+        self._keywords = [(name, keyword.encode()) for name, keyword, _, _ in self.blocks]
+        self._re_start = {
+            name: re.compile(start.encode()) for name, _, start, _ in self.blocks}
+        self._re_marker = re.compile(('^(?:%s)' % '|'.join(
+            '(?P<%s>%s)' % (name, start) for name, _, start, _ in self.blocks)).encode(), re.M)
+        self._re_end = {
+            name: re.compile(('^(?:%s)' % end).encode(), re.M)
+            for name, _, _, end in self.blocks if end is not None}
+        # blocks that end with their marker line
+        self._single_lines = {
+            code for code, (_, _, _, end) in enumerate(self.blocks) if end == ''}
+        # FileParser resolves unknown attributes to None
+        decoders = {name: getattr(self, '_decode_%s' % name) for name, _, _, _ in self.blocks}
+        self._decoders: Dict[str, Callable[[bytes], None]] = {
+            name: decoder for name, decoder in decoders.items() if decoder is not None}
+        self.init_parameters()
+
+    def init_parameters(self):
+        self._block_index = BlockIndex([name for name, _, _, _ in self.blocks])
+        self._parsed = False
+        self.offset = 0
+        self._checkpoint: Tuple[int, Dict[str, int]] = (0, dict())
+        self._terminated = False
+        self._size = 0
+        # the offset the file is read from, the end of it is read up to the size
+        self._read_start = 0
+        self._cpu_time_codes: Dict[bytes, int] = dict()
+        self._decoder_times: Dict[str, float] = None
+        self._parse_time = 0.0
+
+    @property
+    def selection(self) -> Set[str]:
+        return self._selection
+
+    @selection.setter
+    def selection(self, value: Iterable[str]):
+        self._selection = None if value is None else set(value)
+        self._parsed = False
+
+    @property
+    def final(self) -> bool:
+        return self._final
+
+    @final.setter
+    def final(self, value: bool):
+        self._final = value
+        self._parsed = False
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @limit.setter
+    def limit(self, value: int):
+        self._limit = value
+        self._parsed = False
+
+    @property
+    def tail(self) -> bool:
+        return self._tail
+
+    @tail.setter
+    def tail(self, value: bool):
+        self._tail = value
+        self._parsed = False
+
+    def decodes(self, name: str) -> bool:
+        '''
+        Tells if the block with the given name is decoded.
+        '''
+        return self._selection is None or name in self._selection
+
+    def resume(self, offset: int, results: Dict[str, Any]):
+        '''
+        Starts parsing at the given byte offset, results are the results parsed up to it.
+        '''
+        self.offset = offset
+        self._results = {
+            key: val[:] if isinstance(val, (list, array)) else val
+            for key, val in results.items()}
+        self._parsed = False
+
+    @property
+    def checkpoint(self) -> Tuple[int, Dict[str, Any]]:
+        '''
+        The byte offset of the last SCF iteration, up to which all blocks are complete,
+        and the results parsed up to it. The whole file is complete after termination.
+        '''
+        self.parse()
+        if self._terminated:
+            return self._size, self._resume_results(None)
+        offset, counts = self._checkpoint
+        return offset, self._resume_results(counts)
+
+    def _resume_results(self, counts):
+        results = dict()
+        for key, val in self._results.items():
+            if not isinstance(val, (list, array)):
+                results[key] = val
+            elif counts is None:
+                results[key] = val[:]
+            elif counts.get(key):
+                results[key] = val[:counts[key]]
+        return results
+
+    def _save_checkpoint(self, offset):
+        # the results gathered so far are lists or arrays of values per block
+        self._checkpoint = (offset, {
+            key: len(val) for key, val in self._results.items()
+            if isinstance(val, (list, array))})
+
+    @property
+    def results(self):
+        # all quantities are parsed at once, results can be present before parsing when
+        # resumed
+        return self.parse()._results
+
+    @property
+    def block_index(self):
+        '''
+        The byte offset index of the blocks in the mainfile.
+        '''
+        self.parse()
+        return self._block_index
+
+    def _decode_job_id(self, window):
+        self._results['job_id'] = window.split(b'was', 1)[1].strip().decode()
+
+    def _decode_program_version(self, window):
+        # main version, sub version and release are printed on consecutive lines
+        version = [line.split(b':', 1)[1].split()[0] for line in window.splitlines()[:3]]
+        self._results['program_version'] = b' '.join(version).decode()
+        self._results['program_version_sub'] = version[1].decode()
+
+    def _decode_run_info(self, window):
+        # | date        : Tue Jun 30 09:15:56 2015 |
+        # | host        : r12                      |
+        for line in window.splitlines():
+            key, colon, value = line.strip(b'| \t\r').partition(b':')
+            if colon and key.strip() in (b'date', b'host'):
+                self._results[key.strip().decode()] = value.strip(b'| \t\r').decode()
+
+    def _decode_compound(self, window):
+        self._results['compound'] = window.split(b':', 1)[1].strip().decode()
+
+    def _decode_input_start(self, window):
+        # the content of =.in is framed by lines of dashes, it is only complete once its
+        # end marker follows
+        lines = window.split(b'\n', 2)
+        body = lines[2] if len(lines) > 2 else b''
+        body = body[:body.rstrip().rfind(b'\n') + 1]
+        self._results['input_echo'] = body.decode('utf-8', errors='replace')
+
+    def _decode_input_end(self, window):
+        if 'input_echo' in self._results:
+            self._results['input'] = self._results.pop('input_echo')
+
+    def _decode_lattice_vectors(self, window):
+        # the three rows following the marker are labeled a1, a2, a3
+        rows = window.split(b'\n', 4)[1:4]
+        self._results['lattice_vectors'] = np.array(
+            b' '.join(row.split(b':', 1)[1] for row in rows).split(),
+            dtype=np.float64).reshape(3, 3)
+
+    def _decode_atom_sites(self, window):
+        # the table body is decoded as a whole, a truncated file can end within the table
+        # and its incomplete last row is dropped
+        body = window[window.find(b'\n') + 1:window.rfind(b'\n') + 1]
+        tokens = body.split()
+        self._results['atom_labels'] = [label.decode() for label in tokens[1::7]]
+        del tokens[1::7]
+        # index, WPS, CPA-Block, X, Y, Z
+        sites = np.array(list(map(float, tokens))).reshape(-1, 6)
+        self._results['atom_indices'] = sites[:, 0].astype(np.int32)
+        self._results['atom_wyckoff_indices'] = sites[:, 1].astype(np.int32)
+        self._results['atom_cpa_blocks'] = sites[:, 2].astype(np.int32)
+        self._results['atom_positions'] = sites[:, 3:6]
+
+    def _decode_table(self, window, row):
+        # the rows of the table are decoded at once from their fixed width columns, the
+        # rows start with '|' and a blank, an incomplete last row is dropped
+        width = row.itemsize
+        rows = [
+            line[:width] for line in window.split(b'\n')[1:]
+            if line.startswith(b'|  ') and len(line) >= width]
+        return np.frombuffer(b''.join(rows), dtype=row)
+
+    def _decode_symmetry(self, window):
+        # the group is described by key : value lines followed by the generators and the
+        # full group, each preceded by its number of operations and a header line
+        header, _, operations = window.partition(b'Group Generators')
+        group = dict()
+        for line in header.split(b'\n'):
+            key, colon, value = line.partition(b':')
+            if colon:
+                group[key.strip()] = value.strip()
+        generators, _, full_group = operations.partition(b'Full Group Operations')
+        n_operations, _, table = full_group.partition(b'\n')
+        number, _, symbol = group[b'Space group'].partition(b'-')
+        key = (int(number), symbol.strip().decode(), table)
+        symmetry = symmetry_cache.get(key)
+        if symmetry is None:
+            symmetry = decode_symmetry_operations(table)
+            # a truncated file can end within the table
+            if len(symmetry['rotation']) != int(n_operations.strip(b': \t')):
+                return
+            symmetry_cache[key] = symmetry
+
+        point_group_number, _, point_group_symbol = group[b'Point group'].partition(b'-')
+        self._results['symmetry'] = dict(
+            symmetry, space_group_number=key[0], space_group_symbol=key[1],
+            point_group_number=int(point_group_number),
+            point_group_symbol=point_group_symbol.strip().decode(),
+            inversion=group.get(b'Inversion') == b'yes',
+            symmorphic=group.get(b'Symmorphic') == b'yes',
+            generators=[int(index) for index, _, _, _ in re_symmetry_operation.findall(
+                generators)])
+
+    def _decode_atomic_energies(self, window):
+        table = self._decode_table(window, atomic_energies_row)
+        if len(table) == 0:
+            return
+
+        compressed = np.char.strip(table['compression']) != b'none'
+        compression = np.full((2, len(table)), np.nan)
+        compression[0, compressed] = table['compression_radius'][compressed].astype(np.float64)
+        compression[1, compressed] = table['compression_power'][compressed].astype(np.float64)
+        self._results.setdefault('atomic_energies', []).append(dict(
+            relativistic=not window.lstrip(b'= \t').startswith(b'SCALAR'),
+            element=strings(table['element']), orbital=strings(table['orbital']),
+            energy=table['energy'].astype(np.float64), compression_radius=compression[0],
+            compression_power=compression[1], type=strings(table['type']),
+            sort=table['sort'].astype(np.int32)))
+
+    def _decode_basis_radius(self, window):
+        # the rows of the maxima over the core and valence states have no orbital
+        table = self._decode_table(window, basis_radius_row)
+        table = table[np.char.strip(table['orbital']) != b'']
+        if len(table) == 0:
+            return
+
+        self._results.setdefault('basis_radius', []).append(dict(
+            element=strings(table['element']), orbital=strings(table['orbital']),
+            rmin_la=table['rmin_la'].astype(np.float64),
+            rmin_sa=table['rmin_sa'].astype(np.float64),
+            rmin_ld=table['rmin_ld'].astype(np.float64),
+            rmin_sd=table['rmin_sd'].astype(np.float64), type=strings(table['type']),
+            sort=table['sort'].astype(np.int32)))
+
+    def _decode_scf_iteration(self, window):
+        # SCF: iteration  N  dimension  D  last deviation u=  X [CONVERGED]
+        # SCF:               interpolated  new deviation  u=  Y  step p= Z
+        lines = window.split(b'\n', 2)
+        iteration = lines[0].split()
+        interpolated = lines[1].split() if len(lines) > 1 else []
+        if len(interpolated) < 9:
+            interpolated = [b'nan'] * 9
+        # the lines are decoded before any column is appended, a truncated line is skipped
+        values = (
+            int(iteration[2]), int(iteration[4]), float(iteration[8]), float(interpolated[5]),
+            float(interpolated[8]))
+
+        results = self._results
+        if 'scf_iteration' not in results:
+            results['scf_iteration'] = array('i')
+            results['scf_dimension'] = array('i')
+            results['scf_deviation_last'] = array('d')
+            results['scf_deviation_new'] = array('d')
+            results['scf_step'] = array('d')
+        for key, value in zip([
+                'scf_iteration', 'scf_dimension', 'scf_deviation_last', 'scf_deviation_new',
+                'scf_step'], values):
+            results[key].append(value)
+        results['scf_converged'] = iteration[-1] == b'CONVERGED'
+
+    def _decode_cpu_time(self, window):
+        # CPU   : <step>: cpu time:   <seconds> sec, the line is decoded before any column
+        # is appended, a truncated line is skipped
+        step, seconds = window.split(b':', 1)[1].rsplit(b': cpu time:', 1)
+        seconds = float(seconds.split(None, 1)[0])
+        results = self._results
+        steps = results.get('cpu_time_steps')
+        if steps is None:
+            steps = results['cpu_time_steps'] = []
+            results['cpu_time_step'] = array('i')
+            results['cpu_time_iteration'] = array('i')
+            results['cpu_time'] = array('d')
+
+        # the steps are coded by their order of appearance
+        codes = self._cpu_time_codes
+        if len(codes) != len(steps):
+            codes.clear()
+            codes.update((name.encode(), code) for code, name in enumerate(steps))
+        step = step.strip()
+        code = codes.get(step)
+        if code is None:
+            code = codes[step] = len(steps)
+            steps.append(sys.intern(step.decode()))
+
+        results['cpu_time_step'].append(code)
+        # the steps before the first SCF iteration are at -1
+        results['cpu_time_iteration'].append(len(results.get('scf_iteration', ())) - 1)
+        results['cpu_time'].append(seconds)
+
+    def _decode_density_analysis(self, window):
+        # site elem. spin up, spin down, sum, nuclear, excess; the rows are framed by
+        # lines of dashes, the table is skipped if the file ends within it
+        parts = window.split(b'\n--', 2)
+        if len(parts) < 3:
+            return
+        tokens = parts[1].split(b'\n', 1)[1].split()
+        del tokens[1::7]
+        sites = np.array(list(map(float, tokens))).reshape(-1, 6)
+
+        results = self._results
+        if 'density_iteration' not in results:
+            results['density_iteration'] = array('i')
+            results['density_analysis'] = array('d')
+        # the SCF iteration the density is analysed in, -1 before the first
+        results['density_iteration'].append(len(results.get('scf_iteration', ())) - 1)
+        results['density_analysis'].frombytes(sites[:, 1:].tobytes())
+
+    def _decode_charge(self, window):
+        # the totals follow the header of the box, the table of the sites is framed by
+        # lines of dashes and is skipped if the file ends within it
+        lines = window.split(b'\n')
+        rows = [
+            line.split(b'|')[3:5] for line in lines[4:]
+            if line.startswith(b'|') and b'ATOM' not in line]
+        if not rows or not window.rstrip().endswith(b'-'):
+            return
+
+        results = self._results
+        if 'charge' not in results:
+            results['charge'] = array('d')
+            results['site_magnetic_moment'] = array('d')
+        # nu. charge, el. charge, mag. moment, spin up, spin down
+        results['charge'].extend(map(float, lines[3].split()))
+        # mag. moment, nu. charge of each site
+        results['site_magnetic_moment'].extend(float(value) for row in rows for value in row)
+
+    def _decode_fermi_energy(self, window):
+        # Fermi energy:  E; N electrons
+        value = window.split(b'Fermi energy:', 1)[1]
+        if b'electrons' not in value:
+            return
+
+        energy, electrons = value.split(b';', 1)
+        results = self._results
+        if 'energy_reference_fermi' not in results:
+            results['energy_reference_fermi'] = []
+            results['fermi_iteration'] = array('i')
+            results['fermi_electrons'] = array('d')
+        results['energy_reference_fermi'].append(float(energy.split()[0]))
+        results['fermi_iteration'].append(len(results.get('scf_iteration', ())) - 1)
+        results['fermi_electrons'].append(float(electrons.split()[0]))
+
+    def _decode_termination(self, window):
+        # TERMINATION: Finished : SCF calculation
+        self._results['termination'] = window.split(b'\n', 1)[0].split(
+            b':', 1)[1].strip().decode()
+
+    def _decode_total_energy(self, window):
+        # key : value lines, Ecore, EBand, T*S, the EE columns named by the line above, the
+        # stack of the total energies of the last iterations and their average. Only the
+        # new entry of the stack is kept, the others are those of the previous boxes.
+        values: Dict[bytes, List[bytes]] = dict()
+        stack = []
+        header = b''
+        lines = window.split(b'\n')
+        for previous, line in zip(lines, lines[1:]):
+            key, colon, value = line.partition(b':')
+            key = key.replace(b' ', b'')
+            if key == b'estack':
+                stack.append(value)
+            elif colon:
+                values[key] = value.split()
+                if key == b'EE':
+                    header = previous
+        ee = values.get(b'EE')
+        if not ee:
+            return
+
+        results = self._results
+        if 'energy_total' not in results:
+            results['energy_total'] = []
+            results['energy_ee_columns'] = tuple(
+                column.decode() for column in re.split(rb'[ \t]{2,}', header.strip()))
+            for key in [
+                    'energy_ee', 'energy_core', 'energy_band', 'energy_ts', 'energy_stack',
+                    'energy_average', 'energy_average_deviation']:
+                results[key] = array('d')
+            results['energy_stack_size'] = array('i')
+        # the columns are those of the first box
+        n_columns = len(results['energy_ee_columns'])
+        ee = list(map(float, ee[:n_columns])) + [np.nan] * (n_columns - len(ee))
+        results['energy_total'].append(ee[0])
+        results['energy_ee'].extend(ee)
+        for key, name in [(b'Ecore', 'energy_core'), (b'EBand', 'energy_band'), (b'T*S', 'energy_ts')]:
+            results[name].append(float(values[key][0]) if values.get(key) else np.nan)
+        results['energy_stack'].append(float(stack[-1]) if stack else np.nan)
+        results['energy_stack_size'].append(len(stack))
+        average = values.get(b'eav,deav', [])
+        results['energy_average'].append(float(average[0]) if len(average) > 0 else np.nan)
+        results['energy_average_deviation'].append(
+            float(average[1]) if len(average) > 1 else np.nan)
+
+    def _decode(self, decoder, name, window) -> bool:
+        # tells if the first window of a block added its results, the decoders skip
+        # incomplete windows
+        n_results = len(self._results)
+        try:
+            decoder(window)
+        except Exception:
+            self.logger.warn('Error decoding block', data=dict(block=name))
+        return len(self._results) > n_results
+
+    def _timed(self, name, decoder):
+        def timed_decoder(window):
+            start = time.perf_counter()
+            try:
+                decoder(window)
+            finally:
+                self._decoder_times[name] += time.perf_counter() - start
+
+        return timed_decoder
+
+    @property
+    def timing(self) -> Dict[str, Dict[str, float]]:
+        '''
+        The wall time, the number of bytes scanned and the number of matches of each
+        block in the last parse, if instrumented. The time and bytes of a block are those
+        of decoding its windows, locating all blocks is accounted for under markers.
+        '''
+        self.parse()
+        if self._decoder_times is None:
+            return None
+
+        timing: Dict[str, Dict[str, float]] = dict()
+        for name, (start, end) in zip(self._block_index.names, self._block_index.spans):
+            block = timing.setdefault(name, dict(
+                time=self._decoder_times.get(name, 0.0), bytes=0, matches=0))
+            if name in self._decoder_times:
+                block['bytes'] += end - start
+            block['matches'] += 1
+
+        timing['markers'] = dict(
+            time=self._parse_time - sum(self._decoder_times.values()),
+            bytes=self._size - self._read_start, matches=len(self._block_index))
+
+        return timing
+
+    def _find_markers(self, buffer, name, keyword, start, end):
+        # the starts of the marker lines of a block within start and end
+        re_start = self._re_start[name]
+        position = buffer.find(keyword, start, end)
+        while position >= 0:
+            start = buffer.rfind(b'\n', 0, position) + 1
+            if re_start.match(buffer, start):
+                yield start
+            position = buffer.find(keyword, position + len(keyword), end)
+
+    def _decode_last_marker(self, buffer, name, keyword, start, end, decoder):
+        # the start of the last marker line of a block within start and end whose window
+        # decodes, -1 if none. The earlier markers are tried while the windows are
+        # incomplete, e.g. at the end of a running output, each window ends at the marker
+        # after it.
+        re_start = self._re_start[name]
+        re_end = self._re_end.get(name)
+        window_end = end
+        position = buffer.rfind(keyword, start, end)
+        while position >= 0:
+            line_start = buffer.rfind(b'\n', 0, position) + 1
+            if re_start.match(buffer, line_start):
+                if decoder is None:
+                    return line_start
+                block_end = window_end
+                line_end = buffer.find(b'\n', line_start, window_end)
+                if re_end is not None and line_end >= 0:
+                    match = re_end.search(buffer, line_end + 1, window_end)
+                    block_end = window_end if match is None else match.start()
+                if self._decode(decoder, name, buffer[line_start:block_end]):
+                    return line_start
+                window_end = line_start
+            position = buffer.rfind(keyword, start, line_start)
+        return -1
+
+    def _parse_buffer(self, buffer, decoders, header, final):
+        '''
+        Indexes the blocks of the mapped file and decodes their windows. Only the part
+        before the first SCF iteration is indexed if header. If final, the blocks after
+        it are only located by their last marker with a complete window, which is decoded
+        while locating it.
+        '''
+        size = len(buffer)
+        if self._limit is not None and size > self._limit:
+            # the file is read up to the last whole line within the limit
+            size = buffer.rfind(b'\n', 0, self._limit) + 1
+        header_end = size
+        if header or final:
+            keyword = dict(self._keywords)['scf_iteration']
+            header_end = next(self._find_markers(
+                buffer, 'scf_iteration', keyword, self.offset, size), size)
+            size = header_end if header else size
+
+        starts, blocks = array('q'), array('B')
+        for code, (name, keyword) in enumerate(self._keywords):
+            if final and name not in self.header_blocks:
+                start = self._decode_last_marker(
+                    buffer, name, keyword, header_end, size, decoders.get(name))
+                if name in decoders and start >= 0:
+                    starts.append(start)
+                    blocks.append(code)
+            elif name in decoders or name in self.indexed_blocks or self._selection is None:
+                for start in self._find_markers(
+                        buffer, name, keyword, self.offset, header_end if final else size):
+                    starts.append(start)
+                    blocks.append(code)
+        # the markers in the order of the file, followed by its end
+        order = np.argsort(np.frombuffer(starts, dtype=np.int64), kind='stable')
+        starts = array('q', np.frombuffer(starts, dtype=np.int64)[order].tobytes())
+        blocks = array('B', np.frombuffer(blocks, dtype=np.uint8)[order].tobytes())
+        starts.append(size)
+
+        names = [name for name, _ in self._keywords]
+        re_ends = [self._re_end.get(name) for name in names]
+        # the last blocks are already decoded if final
+        decoders = [
+            None if final and name not in self.header_blocks else decoders.get(name)
+            for name in names]
+        append = self._block_index.append
+        for n, code in enumerate(blocks):
+            start, end = starts[n], starts[n + 1]
+            re_end = re_ends[code]
+            if re_end is not None:
+                line_end = buffer.find(b'\n', start, end)
+                if line_end < 0:
+                    pass
+                elif code in self._single_lines:
+                    end = line_end + 1
+                else:
+                    match = re_end.search(buffer, line_end + 1, end)
+                    end = end if match is None else match.start()
+            name = names[code]
+            append(name, start, end)
+
+            if name == 'scf_iteration':
+                self._save_checkpoint(start)
+            elif name == 'termination':
+                self._terminated = True
+            decoder = decoders[code]
+            if decoder is not None:
+                try:
+                    decoder(buffer[start:end])
+                except Exception:
+                    self.logger.warn('Error decoding block', data=dict(block=name))
+
+        self._size = size
+
+    def _parse_lines(self, lines, decoders, header, final):
+        '''
+        Indexes and decodes the blocks while streaming through the lines of the file.
+        Streaming stops at the first SCF iteration if header. If final, only the last
+        window of each block after the header is kept and decoded at the end, or the one
+        before it if the last is incomplete.
+        '''
+        offset = self.offset
+        name, start, window = None, 0, None
+        last_windows: Dict[str, Tuple[int, List[bytes], List[bytes]]] = dict()
+
+        def close_block():
+            self._block_index.append(name, start, offset)
+            if window is None:
+                pass
+            elif final and name not in self.header_blocks:
+                last_windows[name] = (start, window, last_windows.get(name, (0, None, None))[1])
+            else:
+                self._decode(decoders[name], name, b''.join(window))
+
+        for line in lines:
+            if self._limit is not None and offset + len(line) > self._limit:
+                break
+            match = self._re_marker.match(line)
+            if match is not None:
+                if name is not None:
+                    close_block()
+                name, start = match.lastgroup, offset
+                if name == 'scf_iteration' and header:
+                    name = None
+                    break
+                if name == 'scf_iteration':
+                    self._save_checkpoint(start)
+                elif name == 'termination':
+                    self._terminated = True
+                window = [line] if name in decoders else None
+
+            elif name is not None:
+                re_end = self._re_end.get(name)
+                if re_end is not None and re_end.match(line):
+                    close_block()
+                    name = None
+                elif window is not None:
+                    window.append(line)
+
+            offset += len(line)
+
+        if name is not None:
+            close_block()
+        for name, (_, window, previous) in sorted(
+                last_windows.items(), key=lambda item: item[1][0]):
+            if not self._decode(decoders[name], name, b''.join(window)) and previous is not None:
+                self._decode(decoders[name], name, b''.join(previous))
+
+        self._size = offset
+
+    def _parse_tail(self, f, size, decoders):
+        '''
+        Reads the lines of the file backwards from its end and decodes the last complete
+        window of each block. Reading stops once all blocks but the termination, which
+        is printed last, are decoded or at the SCF iteration before the last one, the
+        final state is printed within the last iteration.
+        '''
+        offset = size
+        following: List[bytes] = []
+        spans: List[Tuple[str, int, int]] = []
+        found: Set[str] = set()
+        targets = set(decoders) - {'termination'}
+        last_iteration = False
+        for line in reverse_lines(f, self.offset, size):
+            offset -= len(line)
+            match = self._re_marker.match(line)
+            if match is None:
+                following.append(line)
+                continue
+
+            name = match.lastgroup
+            if name == 'scf_iteration':
+                if last_iteration:
+                    break
+                last_iteration = True
+            # the lines up to the next marker are the following ones in reverse
+            window = [line]
+            re_end = self._re_end.get(name)
+            for following_line in reversed(following):
+                if re_end is not None and re_end.match(following_line):
+                    break
+                window.append(following_line)
+            following = []
+            spans.append((name, offset, offset + sum(map(len, window))))
+
+            if name == 'termination':
+                self._terminated = True
+            if name in decoders and name not in found:
+                if self._decode(decoders[name], name, b''.join(window)):
+                    found.add(name)
+                    if targets <= found:
+                        break
+
+        for name, start, end in reversed(spans):
+            self._block_index.append(name, start, end)
+        self._read_start = offset
+        self._size = size
+
+    def parse(self, key=None):
+        '''
+        Runs the single pass over the file, all quantities are parsed at once.
+        '''
+        if self._results is None:
+            self._results = dict()
+
+        if self._parsed or self.mainfile is None:
+            return self
+
+        decoders = self._decoders
+        header = False
+        if self._selection is not None:
+            decoders = {
+                name: decoder for name, decoder in decoders.items() if name in self._selection}
+            header = self._selection <= self.header_blocks
+        if self.instrument:
+            self._decoder_times = {name: 0.0 for name in decoders}
+            decoders = {name: self._timed(name, decoder) for name, decoder in decoders.items()}
+
+        start = time.perf_counter()
+        self._save_checkpoint(self.offset)
+        self._read_start = self.offset
+        with open(self.mainfile, 'rb') as f:
+            compression = compressions.get(f.read(3))
+            f.seek(0)
+            if compression is not None:
+                # seeking in a compressed file decompresses up to the offset
+                with compression[1](f, 'rb') as cf:
+                    cf.seek(self.offset)
+                    self._parse_lines(cf, decoders, header, self._final or self._tail)
+            elif self._tail:
+                self._parse_tail(f, os.fstat(f.fileno()).st_size, decoders)
+            # empty files cannot be mapped
+            elif self.use_mmap and os.fstat(f.fileno()).st_size > self.offset:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    self._parse_buffer(buffer, decoders, header, self._final)
+            else:
+                f.seek(self.offset)
+                self._parse_lines(f, decoders, header, self._final)
+
+        self._parse_time = time.perf_counter() - start
+        self._parsed = True
+
+        return self
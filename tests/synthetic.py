@@ -0,0 +1,116 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+Generates synthetic FPLO outputs of arbitrary size from the outputs in tests/data.
+'''
+
+import re
+
+re_scf_iteration = re.compile(r'SCF: iteration +(\d+)')
+re_atom_sites = re.compile(r'No\. *Element WPS CPA-Block')
+
+
+def read_template(path='tests/data/hcp_ti/out'):
+    '''
+    Splits an FPLO output into the part before the second SCF cycle, a single SCF cycle
+    and the remaining part starting with the last SCF cycle.
+    '''
+    with open(path) as f:
+        lines = f.readlines()
+
+    starts = [n for n, line in enumerate(lines) if re_scf_iteration.match(line)]
+    head = lines[:starts[1]]
+    cycle = lines[starts[1]:starts[2]]
+    tail = lines[starts[-1]:]
+
+    return head, cycle, tail
+
+
+def tile_sites(lines, n_sites):
+    '''
+    Replaces the rows of the atom sites table in lines by n_sites rows, the sites of the
+    template are repeated with shifted positions.
+    '''
+    start = next(n for n, line in enumerate(lines) if re_atom_sites.match(line)) + 1
+    end = next(n for n in range(start, len(lines)) if not lines[n].strip())
+    rows = [line.split() for line in lines[start:end]]
+
+    sites = []
+    for n in range(n_sites):
+        row = rows[n % len(rows)]
+        shift = 10.0 * (n // len(rows))
+        sites.append('%4d   %-2s   %3s   %6d   %22.15f %22.15f %22.15f\n' % (
+            n + 1, row[1], row[2], n + 1, float(row[4]) + shift, float(row[5]), float(row[6])))
+
+    return lines[:start] + sites + lines[end:]
+
+
+def generate_out(path, n_iterations, template='tests/data/hcp_ti/out', n_sites=None):
+    '''
+    Writes an FPLO output with n_iterations SCF cycles and optionally n_sites atom sites
+    to path and returns the number of bytes written.
+    '''
+    head, cycle, tail = read_template(template)
+    if n_sites is not None:
+        head = tile_sites(head, n_sites)
+
+    def renumber(line, n):
+        return re_scf_iteration.sub('SCF: iteration %2d' % n, line, count=1)
+
+    size = 0
+    with open(path, 'w') as f:
+        size += f.write(''.join(head))
+        for n in range(1, n_iterations + 1):
+            size += f.write(renumber(cycle[0], n))
+            size += f.write(''.join(cycle[1:]))
+        size += f.write(renumber(tail[0], n_iterations + 1))
+        size += f.write(''.join(tail[1:]))
+
+    return size
+
+
+def tile_array(lines, name, n):
+    '''
+    Replaces the elements of the array of structs name in the lines of an =.in file by n
+    elements, the elements of the template are repeated.
+    '''
+    start = next(n for n, line in enumerate(lines) if re.search(r'\} %s\[' % name, line)) + 2
+    end = next(n for n in range(start, len(lines)) if lines[n].strip() == '};')
+    rows = [line.strip().lstrip(',') for line in lines[start:end]]
+
+    elements = ['        %s%s\n' % (',' if m else '', rows[m % len(rows)]) for m in range(n)]
+
+    return lines[:start] + elements + lines[end:]
+
+
+def generate_input(path, n_sites, n_sympoints, template='tests/data/hcp_ti/=.in'):
+    '''
+    Writes an =.in file with n_sites Wyckoff positions and n_sympoints special symmetry
+    points to path and returns the number of bytes written.
+    '''
+    with open(template) as f:
+        lines = f.readlines()
+
+    lines = [re.sub(r'int nsort=\d+;', 'int nsort=%d;' % n_sites, line) for line in lines]
+    for name in ['wyckoff_positions', 'concentrations', 'initial_spin_split']:
+        lines = tile_array(lines, name, n_sites)
+    lines = tile_array(lines, 'special_sympoints', n_sympoints)
+
+    with open(path, 'w') as f:
+        return f.write(''.join(lines))
@@ -0,0 +1,404 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import io
+import sys
+import json
+import time
+import subprocess
+import tracemalloc
+import numpy as np
+import pytest
+
+from nomad.datamodel import EntryArchive
+from nomad.datamodel.metainfo.common_dft import Run, Method
+from fploparser import FploParser
+from fploparser.out_parser import OutParser
+from fploparser.input_parser import InputParser
+from fploparser.batch import parse_batch
+from fploparser.metainfo.fplo_input_autogenerated import x_fplo_in
+
+from synthetic import generate_out, generate_input
+
+# the wall times and speedups depend on the machine and its load, they are only checked
+# with FPLO_BENCHMARK=1, the default run checks the results, the memory and the archive
+# sizes only and skips the largest benchmarks
+timed = bool(os.environ.get('FPLO_BENCHMARK') or os.environ.get('FPLO_BENCHMARK_UPDATE'))
+benchmark_only = pytest.mark.skipif(not timed, reason='set FPLO_BENCHMARK=1 to run')
+
+
+@pytest.fixture(scope='module')
+def parser():
+    return FploParser()
+
+
+def parse_time(parser, mainfile, repeat=3, **kwargs):
+    best = None
+    for _ in range(repeat):
+        archive = EntryArchive()
+        start = time.perf_counter()
+        parser.parse(mainfile, archive, None, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, archive
+
+
+def test_throughput_scales_linearly(parser, tmp_path):
+    throughput = []
+    for n_iterations in [16, 64, 256]:
+        mainfile = str(tmp_path / ('out_%d' % n_iterations))
+        size = generate_out(mainfile, n_iterations)
+        elapsed, archive = parse_time(parser, mainfile)
+        sec_sccs = archive.section_run[0].section_single_configuration_calculation
+        assert len(sec_sccs) == n_iterations + 1
+        throughput.append(size / elapsed)
+        print('%5d iterations %8.2f MB %8.2f MB/s' % (n_iterations, size / 1e6, size / elapsed / 1e6))
+
+    # constant overhead only favours the larger files, a super-linear parse time would
+    # show up as a drop in throughput
+    if timed:
+        assert min(throughput[1:]) > 0.5 * throughput[0]
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_memory_independent_of_size(tmp_path, use_mmap):
+    peaks = []
+    for n_iterations in [16, 256]:
+        mainfile = str(tmp_path / ('out_%d' % n_iterations))
+        size = generate_out(mainfile, n_iterations)
+        out_parser = OutParser(use_mmap=use_mmap)
+        out_parser.mainfile = mainfile
+        tracemalloc.start()
+        out_parser.parse()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert len(out_parser.get('energy_total')) == n_iterations + 1
+
+    # only the per-iteration results and the block index grow, both hold a few numbers
+    # per extracted line, the file content is never held in memory
+    assert peaks[-1] < 0.2 * size
+
+
+def test_resume_cost_depends_on_appended_output(parser, tmp_path):
+    mainfile = str(tmp_path / 'out_256')
+    generate_out(mainfile, 256)
+    full, _ = parse_time(parser, mainfile)
+    with open(mainfile, 'rb') as f:
+        content = f.read()
+
+    # the last few iterations are written after the first poll
+    running = tmp_path / 'out'
+    running.write_bytes(content[:int(0.95 * len(content))])
+    state = parser.resume(str(running), None)
+    running.write_bytes(content)
+    start = time.perf_counter()
+    state = parser.resume(str(running), state)
+    elapsed = time.perf_counter() - start
+
+    sec_sccs = state.archive.section_run[0].section_single_configuration_calculation
+    assert len(sec_sccs) == 257
+    print('full parse %8.4f s, poll %8.4f s' % (full, elapsed))
+    if timed:
+        assert elapsed < 0.25 * full
+
+
+def test_final_energy_query(parser, tmp_path):
+    mainfile = str(tmp_path / 'out_1024')
+    generate_out(mainfile, 1024)
+    full, archive = parse_time(parser, mainfile)
+    sec_scc = archive.section_run[0].section_single_configuration_calculation[-1]
+
+    quantities = [
+        'program_version',
+        'section_run/section_single_configuration_calculation[-1]/energy_total',
+        'section_run/section_single_configuration_calculation[-1]/energy_reference_fermi']
+    best, projected = parse_time(parser, mainfile, quantities=quantities)
+    sec_sccs = projected.section_run[0].section_single_configuration_calculation
+    assert len(sec_sccs) == 1
+    assert sec_sccs[0].energy_total == sec_scc.energy_total
+    print('full parse %8.4f s, final energy %8.4f s' % (full, best))
+    if timed:
+        assert best < 0.1 * full
+
+
+def test_header_only_constant(parser, tmp_path):
+    times = []
+    for n_iterations in [16, 1024]:
+        mainfile = str(tmp_path / ('out_%d' % n_iterations))
+        generate_out(mainfile, n_iterations)
+        best, archive = parse_time(parser, mainfile, repeat=5, header_only=True)
+        assert archive.section_run[0].x_fplo_compound == 'hcp Ti'
+        times.append(best)
+        print('%5d iterations header %8.5f s' % (n_iterations, best))
+
+    # the cost does not depend on the size of the file
+    if timed:
+        assert times[1] < 3 * times[0]
+
+
+def test_tail_only_constant(parser, tmp_path):
+    times = []
+    for n_iterations in [16, 1024]:
+        mainfile = str(tmp_path / ('out_%d' % n_iterations))
+        generate_out(mainfile, n_iterations)
+        best, archive = parse_time(parser, mainfile, repeat=5, tail_only=True)
+        assert archive.section_run[0].x_fplo_run_status == 'converged'
+        times.append(best)
+        print('%5d iterations tail %8.5f s' % (n_iterations, best))
+
+    # the cost does not depend on the number of iterations
+    if timed:
+        assert times[1] < 3 * times[0]
+
+
+@benchmark_only
+@pytest.mark.skipif(os.cpu_count() < 2, reason='needs more than one cpu')
+def test_batch_speedup(tmp_path):
+    for n in range(16):
+        generate_out(str(tmp_path / ('out_%d' % n)), 64)
+
+    reports = []
+    for processes in [1, 2]:
+        reports.append(parse_batch([str(tmp_path)], io.StringIO(), processes=processes))
+        print('%d processes %8.2f files/s %8.2f MB/s' % (
+            processes, reports[-1]['files_per_second'], reports[-1]['mb_per_second']))
+
+    assert reports[1]['files_per_second'] > 1.5 * reports[0]['files_per_second']
+
+
+def test_atom_sites_scale_linearly(tmp_path):
+    times = []
+    for n_sites in [1000, 10000]:
+        mainfile = str(tmp_path / ('out_%d' % n_sites))
+        generate_out(mainfile, 1, n_sites=n_sites)
+        out_parser = OutParser()
+
+        best = None
+        for _ in range(3):
+            out_parser.mainfile = mainfile
+            start = time.perf_counter()
+            out_parser.parse()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        times.append(best)
+        print('%6d sites %8.4f s %8.2f us/site' % (n_sites, best, best / n_sites * 1e6))
+
+        assert out_parser.get('atom_positions').shape == (n_sites, 3)
+        assert out_parser.get('atom_cpa_blocks').dtype == np.int32
+        assert out_parser.get('atom_indices')[-1] == n_sites
+        assert len(out_parser.get('atom_labels')) == n_sites
+
+    # the rest of the file is the same for both
+    if timed:
+        assert times[1] < 10 * times[0]
+
+
+# the parse time, peak memory and archive size of the synthetic outputs are checked
+# against the committed baselines, the time only with FPLO_BENCHMARK=1.
+# FPLO_BENCHMARK_UPDATE=1 overwrites the baselines with the measured values instead
+baselines_path = os.path.join(os.path.dirname(__file__), 'benchmark_baselines.json')
+
+# the measured values may exceed the baselines by these factors, the time tolerance can
+# be adjusted to the machine with FPLO_BENCHMARK_TIME_TOLERANCE
+tolerances = dict(
+    time=float(os.environ.get('FPLO_BENCHMARK_TIME_TOLERANCE', 2.0)),
+    peak_memory=1.25, archive_size=1.05)
+
+
+@pytest.fixture(scope='module')
+def baselines():
+    with open(baselines_path) as f:
+        baselines = json.load(f)
+
+    yield baselines
+
+    if os.environ.get('FPLO_BENCHMARK_UPDATE'):
+        with open(baselines_path, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+@pytest.mark.parametrize('n_iterations, n_sites', [
+    (100, None), (1000, None), pytest.param(10000, None, marks=benchmark_only),
+    (10, 10000)])
+def test_parse_benchmark(benchmark, baselines, tmp_path, n_iterations, n_sites):
+    mainfile = str(tmp_path / 'out')
+    size = generate_out(mainfile, n_iterations, n_sites=n_sites)
+    parser = FploParser()
+
+    times = []
+
+    def parse():
+        archive = EntryArchive()
+        start = time.perf_counter()
+        parser.parse(mainfile, archive, None)
+        times.append(time.perf_counter() - start)
+        return archive
+
+    archive = benchmark.pedantic(parse, rounds=3 if size < 5e7 else 1, iterations=1)
+    sec_run = archive.section_run[0]
+    assert len(sec_run.section_single_configuration_calculation) == n_iterations + 1
+
+    tracemalloc.start()
+    parse()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    measured = dict(
+        time=round(min(times[:-1]), 4), peak_memory=peak_memory,
+        archive_size=len(json.dumps(archive.m_to_dict())))
+    benchmark.extra_info.update(measured, size=size)
+    print('%5d iterations %5s sites %8.2f MB %8.4f s %8.2f MB peak %8.2f MB archive' % (
+        n_iterations, n_sites, size / 1e6, measured['time'], peak_memory / 1e6,
+        measured['archive_size'] / 1e6))
+
+    check_baselines(
+        baselines, '%d_iterations_%s_sites' % (n_iterations, n_sites or 'template'), measured)
+
+
+def check_baselines(baselines, case, measured):
+    if os.environ.get('FPLO_BENCHMARK_UPDATE'):
+        baselines[case] = measured
+        return
+
+    baseline = baselines[case]
+    for key, value in measured.items():
+        if key == 'time' and not timed:
+            continue
+        assert value <= tolerances[key] * baseline[key], '%s of %s regressed' % (key, case)
+
+
+def test_import_time(baselines):
+    # only the modules of the parser count, the import of nomad is out of its control
+    times = []
+    for _ in range(3):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'fploparser', '--help'],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True,
+            check=True)
+        modules = dict()
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_time, _, name = line[len('import time:'):].split('|')
+            modules[name.strip()] = int(self_time)
+        times.append(sum(
+            time for name, time in modules.items() if name.split('.')[0] == 'fploparser'))
+
+    # the input metainfo and the temporaries are only loaded when used
+    assert 'fploparser.out_parser' in modules
+    assert 'fploparser.metainfo.fplo_input_autogenerated' not in modules
+    assert 'fploparser.metainfo.fplo_temporaries' not in modules
+    print('import of fploparser %8.4f s' % (min(times) / 1e6))
+
+    check_baselines(baselines, 'import', dict(time=round(min(times) / 1e6, 4)))
+
+
+def test_metainfo_load_time(baselines, tmp_path):
+    # the load of the environment in a fresh process once the cache is written, nomad
+    # is imported before
+    script = '''if True:
+        import time
+        import nomad.metainfo.legacy, nomad.datamodel.metainfo.general
+        from fploparser import metainfo
+        start = time.perf_counter()
+        metainfo.load()
+        print(time.perf_counter() - start)
+    '''
+    env = dict(os.environ, FPLO_METAINFO_CACHE=str(tmp_path))
+    times = []
+    for _ in range(4):
+        result = subprocess.run(
+            [sys.executable, '-c', script], env=env,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True,
+            check=True)
+        times.append(float(result.stdout.splitlines()[-1]))
+
+    # the first process builds the environment from the modules
+    print('load of the metainfo %8.4f s, from the cache %8.4f s' % (times[0], min(times[1:])))
+    if timed:
+        assert min(times[1:]) < times[0]
+
+    check_baselines(baselines, 'metainfo', dict(time=round(min(times[1:]), 4)))
+
+
+def test_input_scales_linearly(tmp_path):
+    times = []
+    for n_sites in [1000, 10000]:
+        path = str(tmp_path / ('in_%d' % n_sites))
+        generate_input(path, n_sites, n_sites)
+        input_parser = InputParser()
+
+        best = None
+        for _ in range(3):
+            input_parser.mainfile = path
+            start = time.perf_counter()
+            sections = input_parser.results
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        times.append(best)
+        print('%6d sites %8.4f s %8.2f us/site' % (n_sites, best, best / n_sites * 1e6))
+
+        assert len(sections['structure_information']['wyckoff_positions']) == n_sites
+        assert len(sections['structure_dependend']['special_sympoints']) == n_sites
+
+    # the rest of the file is the same for both
+    if timed:
+        assert times[1] < 15 * times[0]
+
+
+@pytest.mark.parametrize('n_sites, n_sympoints', [
+    (1000, 1000), pytest.param(10000, 10000, marks=benchmark_only)])
+def test_input_benchmark(benchmark, baselines, tmp_path, n_sites, n_sympoints):
+    path = str(tmp_path / '=.in')
+    size = generate_input(path, n_sites, n_sympoints)
+    parser = FploParser()
+
+    times = []
+
+    def parse():
+        start = time.perf_counter()
+        input_parser = InputParser(path)
+        sec_input = EntryArchive().m_create(Run).m_create(Method).m_create(x_fplo_in)
+        parser.parse_input_values(sec_input, 'x_fplo_in', input_parser.results)
+        times.append(time.perf_counter() - start)
+        return sec_input
+
+    sec_input = benchmark.pedantic(parse, rounds=3 if n_sites < 10000 else 1, iterations=1)
+    sec_wyckoff = sec_input.x_fplo_in_structure_information[0].x_fplo_in_structure_information_wyckoff_positions
+    assert len(sec_wyckoff) == n_sites
+
+    tracemalloc.start()
+    parse()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    measured = dict(
+        time=round(min(times[:-1]), 4), peak_memory=peak_memory,
+        archive_size=len(json.dumps(sec_input.m_to_dict())))
+    benchmark.extra_info.update(measured, size=size)
+    print('%6d sites %6d sympoints %8.2f MB %8.4f s %8.2f MB peak %8.2f MB archive' % (
+        n_sites, n_sympoints, size / 1e6, measured['time'], peak_memory / 1e6,
+        measured['archive_size'] / 1e6))
+
+    check_baselines(baselines, '%d_sites_%d_sympoints_input' % (n_sites, n_sympoints), measured)
@@ -16,10 +16,27 @@
 # limitations under the License.
 #
 
+import os
+import sys
+import subprocess
 import pytest
+import numpy as np
+import io
+import json
+import shutil
+import gzip
+import bz2
+import lzma
 
 from nomad.datamodel import EntryArchive
+from nomad.datamodel.metainfo.common_dft import Run, Method
 from fploparser import FploParser
+from fploparser.out_parser import OutParser, reverse_lines
+from fploparser.input_parser import InputParser
+from fploparser.batch import parse_batch
+from fploparser.cache import ParseCache
+from fploparser import metainfo
+from fploparser.metainfo.fplo_input_autogenerated import x_fplo_in
 
 
 def approx(value, abs=0, rel=1e-6):
@@ -31,6 +48,14 @@ def parser():
     return FploParser()
 
 
+def compress(path, open_compressed=gzip.open):
+    # a compressed copy of the hcp_ti output
+    with open('tests/data/hcp_ti/out', 'rb') as f, open_compressed(path, 'wb') as cf:
+        cf.write(f.read())
+
+    return path
+
+
 def test_basic(parser):
     archive = EntryArchive()
 
@@ -55,4 +80,800 @@ def test_1(parser):
 
     parser.parse('tests/data/dhcp_gd/out', archive, None)
 
-    assert len(archive.section_run[0].section_system[0].atom_positions) == 4
+    sec_system = archive.section_run[0].section_system[0]
+    assert len(sec_system.atom_positions) == 4
+    assert list(sec_system.x_fplo_atom_idx) == [1, 2, 3, 4]
+    assert list(sec_system.x_fplo_atom_wyckoff_idx) == [1, 1, 2, 2]
+    assert list(sec_system.x_fplo_atom_cpa_block) == [1, 2, 3, 4]
+
+
+def test_scf_history(parser):
+    archive = EntryArchive()
+
+    parser.parse('tests/data/hcp_ti/out', archive, None)
+
+    sec_run = archive.section_run[0]
+    assert list(sec_run.x_fplo_scf_iteration) == list(range(15))
+    assert list(sec_run.x_fplo_scf_dimension[:5]) == [0, 1, 1, 2, 1]
+    assert sec_run.x_fplo_scf_deviation_last[1] == approx(0.15)
+    assert sec_run.x_fplo_scf_deviation_new[13] == approx(0.14e-7)
+    assert sec_run.x_fplo_scf_step[13] == approx(0.227)
+    # the converged iteration has no interpolation
+    assert np.isnan(sec_run.x_fplo_scf_step[14])
+    assert sec_run.x_fplo_scf_converged
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_scf_history_truncated(tmp_path, use_mmap):
+    with open('tests/data/hcp_ti/out', 'rb') as f:
+        content = f.read()
+    # the output ends within the line of the iteration
+    end = content.index(b'SCF: iteration  5') + 29
+    mainfile = tmp_path / 'out'
+    mainfile.write_bytes(content[:end])
+
+    archive = EntryArchive()
+    FploParser(use_mmap=use_mmap).parse(str(mainfile), archive, None)
+
+    sec_run = archive.section_run[0]
+    assert list(sec_run.x_fplo_scf_iteration) == list(range(5))
+    assert len(sec_run.x_fplo_scf_deviation_last) == len(sec_run.x_fplo_scf_step) == 5
+
+
+def test_cpu_time(parser):
+    archive = EntryArchive()
+
+    parser.parse('tests/data/hcp_ti/out', archive, None)
+
+    sec_run = archive.section_run[0]
+    steps = sec_run.x_fplo_cpu_time_step
+    cpu_time = sec_run.x_fplo_cpu_time.magnitude
+    assert len(steps) == len(set(steps)) == 23
+    assert cpu_time.shape == (23, 16)
+    assert cpu_time.sum() == approx(251.76)
+    assert cpu_time[steps.index('radial equation'), 0] == approx(0.14)
+    assert cpu_time[steps.index('Kohn-Sham equation'), 1] == approx(1.75)
+    assert cpu_time[steps.index('total fplo calculation'), -1] == approx(54.84)
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_cpu_time_truncated(tmp_path, use_mmap):
+    with open('tests/data/hcp_ti/out', 'rb') as f:
+        content = f.read()
+    # the output ends within the line of a step
+    end = content.index(b'Kohn-Sham equation: cpu time:', 40000) + 32
+    mainfile = tmp_path / 'out'
+    mainfile.write_bytes(content[:end])
+
+    archive = EntryArchive()
+    FploParser(use_mmap=use_mmap).parse(str(mainfile), archive, None)
+
+    sec_run = archive.section_run[0]
+    cpu_time = sec_run.x_fplo_cpu_time.magnitude
+    assert cpu_time.shape == (len(sec_run.x_fplo_cpu_time_step), len(sec_run.x_fplo_scf_iteration) + 1)
+
+
+def test_symmetry(parser):
+    archive = EntryArchive()
+
+    parser.parse('tests/data/hcp_ti/out', archive, None)
+
+    sec_symmetry = archive.section_run[0].section_system[0].x_fplo_symmetry
+    assert sec_symmetry.x_fplo_symmetry_space_group_number == 194
+    assert sec_symmetry.x_fplo_symmetry_space_group_symbol == 'P63/MMC'
+    assert sec_symmetry.x_fplo_symmetry_point_group_symbol == 'D6H'
+    assert sec_symmetry.x_fplo_symmetry_inversion
+    assert not sec_symmetry.x_fplo_symmetry_symmorphic
+    assert list(sec_symmetry.x_fplo_symmetry_generators) == [27, 1, 32]
+    assert len(sec_symmetry.x_fplo_symmetry_operation_index) == 24
+    n = list(sec_symmetry.x_fplo_symmetry_operation_index).index(27)
+    assert sec_symmetry.x_fplo_symmetry_operation_symbol[n] == 'C1/6(z)'
+    assert sec_symmetry.x_fplo_symmetry_rotation[n].tolist() == [[1, -1, 0], [1, 0, 0], [0, 0, 1]]
+    assert list(sec_symmetry.x_fplo_symmetry_translation_numerator[n]) == [0, 0, 1]
+    assert list(sec_symmetry.x_fplo_symmetry_translation_denominator[n]) == [1, 1, 2]
+    assert sec_symmetry.x_fplo_symmetry_rotation[0].tolist() == np.eye(3).tolist()
+
+
+def test_symmetry_cache():
+    # both calculations are in the same setting of the same group, the operations are
+    # decoded once
+    symmetry = OutParser('tests/data/hcp_ti/out').get('symmetry')
+    symmetry_cached = OutParser('tests/data/dhcp_gd/out').get('symmetry')
+    assert symmetry_cached['rotation'] is symmetry['rotation']
+    assert not symmetry['rotation'].flags.writeable
+
+
+def test_basis(parser):
+    archive = EntryArchive()
+
+    parser.parse('tests/data/dhcp_gd/out', archive, None)
+
+    sec_run = archive.section_run[0]
+    sec_energies = sec_run.x_fplo_atomic_energies
+    assert [sec.x_fplo_atomic_energies_relativistic for sec in sec_energies] == [True, False]
+    # the states of both sorts
+    assert len(sec_energies[0].x_fplo_atomic_energies_element) == 58
+    assert sec_energies[0].x_fplo_atomic_energies_orbital[0] == '1s1 1/2'
+    assert sec_energies[0].x_fplo_atomic_energies_energy[0].to('hartree').magnitude == approx(-1839.26517355)
+    assert np.isnan(sec_energies[0].x_fplo_atomic_energies_compression_radius[0].magnitude)
+    assert sec_energies[1].x_fplo_atomic_energies_orbital[-1] == '5f'
+    assert sec_energies[1].x_fplo_atomic_energies_compression_radius[-1].to('bohr').magnitude == approx(5.776)
+    assert sec_energies[1].x_fplo_atomic_energies_compression_power[-1] == approx(14)
+    assert sec_energies[1].x_fplo_atomic_energies_type[-1] == 'valence'
+    assert list(sec_energies[1].x_fplo_atomic_energies_sort[[0, -1]]) == [1, 2]
+
+    sec_radius = sec_run.x_fplo_basis_radius
+    assert len(sec_radius) == 1
+    # the maxima are not included
+    assert len(sec_radius[0].x_fplo_basis_radius_orbital) == 36
+    assert sec_radius[0].x_fplo_basis_radius_orbital[9] == '5s'
+    assert sec_radius[0].x_fplo_basis_radius_rmin_la[0].to('bohr').magnitude == approx(0.4071)
+    assert sec_radius[0].x_fplo_basis_radius_rmin_sd[-1].to('bohr').magnitude == approx(7.7171)
+    assert sec_radius[0].x_fplo_basis_radius_type[0] == 'Core'
+    assert sec_radius[0].x_fplo_basis_radius_sort[-1] == 2
+
+
+def test_energy(parser):
+    archive = EntryArchive()
+
+    parser.parse('tests/data/dhcp_gd/out', archive, None)
+
+    sec_run = archive.section_run[0]
+    assert sec_run.x_fplo_energy_ee_columns[-1] == 'LSAD+U energy'
+    energy_ee = sec_run.x_fplo_energy_ee.to('hartree').magnitude
+    assert energy_ee.shape == (35, 5)
+    assert energy_ee[-1, 0] == approx(-45122.4023252379)
+    assert energy_ee[-1, 4] == approx(-0.00076266)
+    assert sec_run.x_fplo_energy_core[0].to('hartree').magnitude == approx(-27735.87846839)
+    assert sec_run.x_fplo_energy_band[-1].to('hartree').magnitude == approx(-27898.78034848)
+    assert sec_run.x_fplo_energy_ts[-1].magnitude == 0
+    # the stack grows up to five entries, only the new one is kept
+    assert list(sec_run.x_fplo_energy_stack_size[:6]) == [1, 2, 3, 4, 5, 5]
+    assert sec_run.x_fplo_energy_stack[-1].to('hartree').magnitude == approx(-45122.40232524)
+    assert sec_run.x_fplo_energy_average[-1].to('hartree').magnitude == approx(-45122.40232523)
+    assert sec_run.x_fplo_energy_average_deviation[2].to('hartree').magnitude == approx(1.32133207)
+    # the energies are stored in the hartree they are printed in, the total energy of
+    # the calculations takes them as eV
+    sec_sccs = sec_run.section_single_configuration_calculation
+    assert sec_sccs[34].energy_total.to('eV').magnitude == approx(energy_ee[-1, 0])
+
+
+def test_fermi_energy(parser):
+    archive = EntryArchive()
+
+    parser.parse('tests/data/dhcp_gd/out', archive, None)
+
+    sec_run = archive.section_run[0]
+    # the Fermi energy is estimated up to four times in each SCF iteration
+    assert len(sec_run.x_fplo_fermi_energy) == 51
+    assert list(sec_run.x_fplo_fermi_iteration[:7]) == [0, 0, 0, 1, 1, 1, 1]
+    assert sec_run.x_fplo_fermi_energy[1].to('hartree').magnitude == approx(0.257675)
+    assert sec_run.x_fplo_fermi_electrons[-1] == approx(72)
+    # the estimates of each SCF iteration are kept with its calculation
+    sec_sccs = sec_run.section_single_configuration_calculation
+    assert [len(sec_scc.section_scf_iteration) for sec_scc in sec_sccs[:4]] == [3, 4, 2, 2]
+    sec_scfs = sec_sccs[1].section_scf_iteration
+    assert sec_scfs[0].x_fplo_t_energy_reference_fermi_iteration.to('hartree').magnitude == approx(
+        sec_run.x_fplo_fermi_energy[3].to('hartree').magnitude)
+    assert not sec_sccs[-1].section_scf_iteration
+
+
+def test_density_analysis(parser):
+    archive = EntryArchive()
+
+    parser.parse('tests/data/dhcp_gd/out', archive, None)
+
+    sec_run = archive.section_run[0]
+    # the density is analysed after mixing and after the Kohn-Sham step
+    assert list(sec_run.x_fplo_density_iteration[:4]) == [0, 0, 1, 1]
+    assert sec_run.x_fplo_density_spin_up.shape == (70, 4)
+    assert sec_run.x_fplo_density_spin_up[1, 0] == approx(33.53885809)
+    assert sec_run.x_fplo_density_spin_down[-1, 3] == approx(28.20755915)
+    assert sec_run.x_fplo_density_electrons[-1].sum() == approx(256.0000059)
+    assert sec_run.x_fplo_density_nuclear[0, 0] == approx(64)
+    assert sec_run.x_fplo_density_excess[-1, 0] == approx(-0.00572953)
+
+    assert sec_run.x_fplo_charge_nuclear.shape == (70,)
+    assert sec_run.x_fplo_charge_electronic[1] == approx(255.999999)
+    assert sec_run.x_fplo_charge_magnetic_moment[1].magnitude == approx(12.4630778)
+    assert sec_run.x_fplo_charge_spin_up[-1] == approx(143.1432941)
+    assert sec_run.x_fplo_charge_spin_down[-1] == approx(112.8567118)
+    moments = sec_run.x_fplo_site_magnetic_moment.magnitude
+    assert moments.shape == (70, 4)
+    assert moments[0, 0] == approx(7)
+    assert moments[-1, 3] == approx(7.5906142)
+    assert sec_run.x_fplo_site_nuclear_charge[-1, 3] == approx(64)
+
+
+def test_input(parser):
+    archive = EntryArchive()
+
+    parser.parse('tests/data/hcp_ti/out', archive, None)
+
+    sec_input = archive.section_run[0].section_method[0].x_fplo_in[0]
+    assert sec_input.x_fplo_in_header[0].x_fplo_in_header_compound == 'hcp Ti'
+    sec_structure = sec_input.x_fplo_in_structure_information[0]
+    assert sec_structure.x_fplo_in_structure_information_spacegroup[0].x_fplo_in_structure_information_spacegroup_number == 194
+    assert list(sec_structure.x_fplo_in_structure_information_lattice_constants) == [2.95, 2.95, 4.68]
+    sec_wyckoff = sec_structure.x_fplo_in_structure_information_wyckoff_positions
+    assert len(sec_wyckoff) == 1
+    assert sec_wyckoff[0].x_fplo_in_structure_information_wyckoff_positions_element == 'Ti'
+    assert list(sec_wyckoff[0].x_fplo_in_structure_information_wyckoff_positions_tau) == approx([1 / 3, 2 / 3, 1 / 4])
+    sec_sympoints = sec_input.x_fplo_in_structure_dependend[0].x_fplo_in_structure_dependend_special_sympoints
+    assert len(sec_sympoints) == 8
+    assert sec_sympoints[6].x_fplo_in_structure_dependend_special_sympoints_label == 'H'
+    sec_options = sec_input.x_fplo_in_options[0]
+    assert sec_options.x_fplo_in_options_options[0].x_fplo_in_options_options_NO_SYMMETRYTEST
+    assert not sec_options.x_fplo_in_options_options[0].x_fplo_in_options_options_CALC_DOS
+    assert sec_options.x_fplo_in_options_charges[0].x_fplo_in_options_charges_chargemode[0].x_fplo_in_options_charges_chargemode_description == 'None'
+    assert not sec_options.x_fplo_in_options_charges[0].x_fplo_in_options_charges_vca
+    sec_bandweight = sec_input.x_fplo_in_bandstructure_plot[0].x_fplo_in_bandstructure_plot_bandweight_control[0]
+    assert sec_bandweight.x_fplo_in_bandstructure_plot_bandweight_control_frelprojection[0].x_fplo_in_bandstructure_plot_bandweight_control_frelprojection_description == 'jmu'
+    sec_iteration = sec_input.x_fplo_in_iteration_control[0]
+    assert sec_iteration.x_fplo_in_iteration_control_etot_tolerance == approx(1e-8)
+
+
+def test_input_echo(parser, tmp_path):
+    with open('tests/data/hcp_ti/out') as f:
+        content = f.read()
+    with open('tests/data/hcp_ti/=.in') as f:
+        edited = f.read().replace('"hcp Ti"', '"edited"')
+
+    def compound(archive):
+        return archive.section_run[0].section_method[0].x_fplo_in[0].x_fplo_in_header[0].x_fplo_in_header_compound
+
+    # the echo in the output is the input of the calculation, the =.in file is not read
+    (tmp_path / 'out').write_text(content)
+    (tmp_path / '=.in').write_text(edited)
+    archive = EntryArchive()
+    parser.parse(str(tmp_path / 'out'), archive, None)
+    assert compound(archive) == 'hcp Ti'
+
+    # without the echo the =.in file is read
+    start = content.index('Start: content of =.in')
+    end = content.index('\n', content.index('End  : content of =.in')) + 1
+    (tmp_path / 'out').write_text(content[:start] + content[end:])
+    archive = EntryArchive()
+    parser.parse(str(tmp_path / 'out'), archive, None)
+    assert compound(archive) == 'edited'
+
+
+def test_input_parser(parser):
+    # nested arrays of structs as in the grids of the advanced output
+    sections = InputParser().parse_text('''
+section Advanced_output{
+    logical grids_active=t;
+    struct {
+        struct {int type;char[*] description;} basis;
+        real origin[3];int subdivision[3];char[*] file;
+        struct {char[*] name;
+            struct {real emin;real emax;real de;
+                struct {int type;char[*] description;} spin;
+            } sections[*];
+        } energywindows[*];
+        struct {char[*] name;real kpoint[3];int bandindices[*];real energywindow[2];} kresolved[*];
+    } grids[*]
+    ={
+        {{1,"cartesian"},{0,0,0},{10,10,10},"grid.dat"
+         ,{{"valence",{{-1.0,0.0,1.e-2,{1,"up"}},{-1.0,0.0,1.e-2,{2,"down"}}}}}
+         ,{{"G",{0,0,0},{1,2},{-1,1}}}}
+        ,{{2,"lattice"},{1/2,1/2,-(1+1)/4},{4,4,4},"grid2.dat",{},{}}
+    };
+};
+''')
+    grids = sections['Advanced_output']['grids']
+    assert len(grids) == 2
+    assert grids[0]['energywindows'][0]['sections'][1]['spin']['description'] == 'down'
+    assert grids[0]['kresolved'][0]['bandindices'].dtype == np.int32
+    assert list(grids[1]['origin']) == [0.5, 0.5, -0.5]
+    assert grids[1]['energywindows'] == []
+
+    sec_input = EntryArchive().m_create(Run).m_create(Method).m_create(x_fplo_in)
+    parser.parse_input_values(sec_input, 'x_fplo_in', sections)
+    sec_output = sec_input.x_fplo_in_Advanced_output[0]
+    assert sec_output.x_fplo_in_Advanced_output_grids_active
+    sec_grids = sec_output.x_fplo_in_Advanced_output_grids
+    assert sec_grids[1].x_fplo_in_Advanced_output_grids_file == 'grid2.dat'
+    sec_sections = sec_grids[0].x_fplo_in_Advanced_output_grids_energywindows[0].x_fplo_in_Advanced_output_grids_energywindows_sections
+    assert sec_sections[1].x_fplo_in_Advanced_output_grids_energywindows_sections_spin[0].x_fplo_in_Advanced_output_grids_energywindows_sections_spin_type == 2
+
+    with pytest.raises(ValueError, match='line 2'):
+        InputParser().parse_text('section header{\n    int nsort=;\n};')
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_timing(use_mmap):
+    timings = []
+    archive = EntryArchive()
+    parser = FploParser(use_mmap=use_mmap, timing_callback=lambda *args: timings.append(args))
+
+    parser.parse('tests/data/hcp_ti/out', archive, None)
+
+    assert len(timings) == 1
+    mainfile, timing = timings[0]
+    assert mainfile.endswith('hcp_ti/out')
+    assert timing['total_energy']['matches'] == 14
+    assert timing['cpu_time']['matches'] == 257
+    assert timing['markers']['bytes'] == 179804
+    # the window of the termination spans up to the end of the file
+    assert timing['termination']['bytes'] == 40
+    assert all(block['time'] >= 0 for block in timing.values())
+
+    sec_timings = archive.section_run[0].x_fplo_parser_timing
+    assert [sec_timing.x_fplo_parser_timing_block for sec_timing in sec_timings] == list(timing)
+    sec_timing = sec_timings[list(timing).index('total_energy')]
+    assert sec_timing.x_fplo_parser_timing_matches == 14
+    assert sec_timing.x_fplo_parser_timing_bytes == timing['total_energy']['bytes'] > 0
+
+
+def test_timing_cache(tmp_path):
+    cache = ParseCache(str(tmp_path / 'cache'))
+    FploParser(cache=cache).parse('tests/data/hcp_ti/out', EntryArchive(), None)
+
+    # instrumented parses do not use the cache
+    timings = []
+    parser = FploParser(cache=cache, timing_callback=lambda *args: timings.append(args))
+    for _ in range(2):
+        archive = EntryArchive()
+        parser.parse('tests/data/hcp_ti/out', archive, None)
+        assert archive.section_run[0].x_fplo_parser_timing
+    assert len(timings) == 2
+
+
+def test_buffered():
+    archive = EntryArchive()
+
+    FploParser(use_mmap=False).parse('tests/data/hcp_ti/out', archive, None)
+
+    sec_sccs = archive.section_run[0].section_single_configuration_calculation
+    assert len(sec_sccs) == 14
+    assert sec_sccs[5].energy_total.magnitude == approx(-2.73593178e-16)
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_malformed_block(tmp_path, use_mmap):
+    with open('tests/data/hcp_ti/out', 'rb') as f:
+        content = f.read()
+    mainfile = tmp_path / 'out'
+    mainfile.write_bytes(content.replace(b'a1  :  4.8', b'a1  : x 4.8', 1))
+
+    archive = EntryArchive()
+    FploParser(use_mmap=use_mmap).parse(str(mainfile), archive, None)
+
+    # the block is skipped, the rest of the output is parsed
+    sec_run = archive.section_run[0]
+    assert sec_run.section_system[0].lattice_vectors is None
+    assert len(sec_run.section_system[0].atom_labels) == 2
+    assert len(sec_run.section_single_configuration_calculation) == 14
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_block_index(tmp_path, use_mmap):
+    out_parser = OutParser(use_mmap=use_mmap)
+    out_parser.mainfile = 'tests/data/hcp_ti/out'
+
+    index = out_parser.block_index
+    assert len(index.get('scf_iteration')) == 15
+    assert len(index.get('total_energy')) == 14
+    assert len(index.get('termination')) == 1
+    with open('tests/data/hcp_ti/out', 'rb') as f:
+        start, end = index.get('lattice_vectors')[0]
+        f.seek(start)
+        assert f.read(end - start).count(b'\n') == 4
+        # cut the file in the middle of the atom sites table
+        start, end = index.get('atom_sites')[0]
+        f.seek(0)
+        content = f.read(end - 20)
+
+    mainfile = tmp_path / 'out'
+    mainfile.write_bytes(content)
+    out_parser.mainfile = str(mainfile)
+    assert len(out_parser.get('atom_labels')) == 1
+    assert out_parser.get('energy_total') is None
+
+
+@pytest.mark.parametrize('mainfile, use_mmap', [
+    ('tests/data/hcp_ti/out', True),
+    ('tests/data/hcp_ti/out', False),
+    ('tests/data/dhcp_gd/out', True)])
+def test_resume(tmp_path, mainfile, use_mmap):
+    archive = EntryArchive()
+    FploParser().parse(mainfile, archive, None)
+    sec_sccs = archive.section_run[0].section_single_configuration_calculation
+
+    with open(mainfile, 'rb') as f:
+        content = f.read()
+
+    # the output is written in chunks, some of which end within a line or within the
+    # echo of =.in
+    parser = FploParser(use_mmap=use_mmap)
+    state = None
+    running = tmp_path / 'out'
+    for size in [5000, 20000, 50001, 50001, 123457, len(content)]:
+        running.write_bytes(content[:size])
+        state = parser.resume(str(running), state)
+        assert state.offset <= size
+
+    assert state.offset == len(content)
+    sec_run = state.archive.section_run[0]
+    assert sec_run.program_version == archive.section_run[0].program_version
+    assert len(sec_run.section_system) == 1
+    assert len(sec_run.section_method) == 1
+    assert sec_run.section_method[0].m_to_dict() == archive.section_run[0].section_method[0].m_to_dict()
+    assert list(sec_run.x_fplo_scf_dimension) == list(archive.section_run[0].x_fplo_scf_dimension)
+    assert sec_run.x_fplo_cpu_time_step == archive.section_run[0].x_fplo_cpu_time_step
+    assert np.array_equal(
+        sec_run.x_fplo_cpu_time.magnitude, archive.section_run[0].x_fplo_cpu_time.magnitude)
+    resumed_sccs = sec_run.section_single_configuration_calculation
+    assert len(resumed_sccs) == len(sec_sccs)
+    for sec_scc, resumed_scc in zip(sec_sccs, resumed_sccs):
+        assert resumed_scc.energy_total == sec_scc.energy_total
+        assert resumed_scc.energy_reference_fermi == sec_scc.energy_reference_fermi
+        assert len(resumed_scc.section_scf_iteration) == len(sec_scc.section_scf_iteration)
+
+
+@pytest.mark.parametrize('compression, open_compressed', [
+    ('gz', gzip.open), ('bz2', bz2.open), ('xz', lzma.open)])
+def test_compressed(parser, tmp_path, compression, open_compressed):
+    mainfile = compress(str(tmp_path / ('out.%s' % compression)), open_compressed)
+
+    # mainfiles are matched on the first kB of the decompressed file
+    with open_compressed(mainfile, 'rb') as cf:
+        buffer = cf.read(1024)
+    assert parser.is_mainfile(mainfile, 'text/plain', buffer, buffer.decode(), compression)
+
+    archive = EntryArchive()
+    parser.parse(mainfile, archive, None)
+
+    sec_run = archive.section_run[0]
+    assert sec_run.program_version == '14.00 M-CPA 47'
+    assert sec_run.section_system[0].atom_labels == ['Ti', 'Ti']
+    sec_sccs = sec_run.section_single_configuration_calculation
+    assert len(sec_sccs) == 14
+    assert sec_sccs[5].energy_total.magnitude == approx(-2.73593178e-16)
+
+
+def test_batch(tmp_path):
+    shutil.copytree('tests/data', str(tmp_path / 'data'))
+    compress(str(tmp_path / 'out.gz'))
+
+    output = io.StringIO()
+    report = parse_batch([str(tmp_path)], output, processes=2)
+
+    # the =.in files are not matched as mainfiles, NaN is written as null
+    results = [
+        json.loads(line, parse_constant=pytest.fail)
+        for line in output.getvalue().splitlines()]
+    assert report['files'] == len(results) == 3
+    assert report['files_per_second'] > 0 and report['mb_per_second'] > 0
+    results = {os.path.relpath(result['mainfile'], str(tmp_path)): result for result in results}
+    assert sorted(results) == ['data/dhcp_gd/out', 'data/hcp_ti/out', 'out.gz']
+    for result in results.values():
+        assert result['archive']['section_run'][0]['program_name'] == 'fplo'
+    sec_sccs = results['out.gz']['archive']['section_run'][0]['section_single_configuration_calculation']
+    assert len(sec_sccs) == 14
+    assert results['out.gz']['archive']['section_run'][0]['x_fplo_scf_step'][14] is None
+
+    # a missing file is reported and does not stop the batch
+    output = io.StringIO()
+    missing = str(tmp_path / 'missing')
+    report = parse_batch([missing, 'tests/data/hcp_ti/out'], output, processes=1)
+    results = {result['mainfile']: result for result in map(json.loads, output.getvalue().splitlines())}
+    assert report['files'] == 2
+    assert results[missing]['error'].startswith('FileNotFoundError')
+    assert 'archive' in results['tests/data/hcp_ti/out']
+
+
+def test_main_json():
+    # the archive of a single file is strict JSON, NaN is written as null
+    result = subprocess.run(
+        [sys.executable, '-m', 'fploparser', 'tests/data/hcp_ti/out'], stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL, universal_newlines=True, check=True)
+    archive = json.loads(result.stdout, parse_constant=pytest.fail)
+    assert archive['section_run'][0]['x_fplo_scf_step'][14] is None
+
+
+def test_cache(tmp_path):
+    shutil.copytree('tests/data/hcp_ti', str(tmp_path / 'hcp_ti'))
+    mainfile = str(tmp_path / 'hcp_ti' / 'out')
+    cache = ParseCache(str(tmp_path / 'cache'))
+    parser = FploParser(cache=cache)
+
+    archive = EntryArchive()
+    parser.parse(mainfile, archive, None)
+    assert len(os.listdir(cache.directory)) == 1
+    key = cache.key(mainfile)
+
+    # a hit does not parse the mainfile
+    parser.out_parser.mainfile = None
+    cached = EntryArchive()
+    parser.parse(mainfile, cached, None)
+    assert parser.out_parser.mainfile is None
+    assert json.dumps(cached.m_to_dict()) == json.dumps(archive.m_to_dict())
+    sec_sccs = cached.section_run[0].section_single_configuration_calculation
+    assert sec_sccs[5].energy_total.magnitude == approx(-2.73593178e-16)
+
+    # the echo in the output is parsed, a changed =.in is a hit
+    with open(str(tmp_path / 'hcp_ti' / '=.in'), 'a') as f:
+        f.write('\n')
+    assert cache.key(mainfile) == key
+
+    # a changed output is a miss
+    with open(mainfile, 'a') as f:
+        f.write('\n')
+    parser.parse(mainfile, EntryArchive(), None)
+    assert parser.out_parser.mainfile == mainfile
+    assert len(os.listdir(cache.directory)) == 2
+
+    # the least recently used archive is evicted down to the low water of the size
+    cache.max_size = 2.5 * os.path.getsize(os.path.join(cache.directory, '%s.json' % key))
+    with open(mainfile, 'a') as f:
+        f.write('\n')
+    parser.parse(mainfile, EntryArchive(), None)
+    assert len(os.listdir(cache.directory)) == 2
+    assert cache.get(key) is None
+
+    # without the echo, =.in is parsed and a changed one is a miss
+    with open(mainfile) as f:
+        content = f.read()
+    start = content.index('Start: content of =.in')
+    end = content.index('\n', content.index('End  : content of =.in')) + 1
+    with open(mainfile, 'w') as f:
+        f.write(content[:start] + content[end:])
+    key = cache.key(mainfile)
+    with open(str(tmp_path / 'hcp_ti' / '=.in'), 'a') as f:
+        f.write('\n')
+    assert cache.key(mainfile) != key
+
+
+def test_cache_scans(tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path / 'cache'), max_size=1000)
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, 'scandir', lambda path: scans.append(path) or scandir(path))
+
+    # the directory is only scanned by the first put and once the size is exceeded
+    for n in range(10):
+        cache.put(str(n), [dict(program_name='fplo')])
+    assert len(scans) == 1
+    for n in range(10, 40):
+        cache.put(str(n), [dict(program_name='fplo')])
+    assert 1 < len(scans) < 10
+    assert sum(os.path.getsize(entry.path) for entry in scandir(cache.directory)) <= 1000
+
+
+def test_cache_temporaries(tmp_path):
+    # the output ends before the echo of =.in, the run has only temporaries
+    with open('tests/data/hcp_ti/out', 'rb') as f:
+        content = f.read()
+    mainfile = tmp_path / 'out'
+    mainfile.write_bytes(content[:content.index(b'Start: content')])
+
+    # the first process fills the cache, the second loads the run from it
+    script = '''if True:
+        import sys
+        from nomad.datamodel import EntryArchive
+        from fploparser import FploParser
+        from fploparser.cache import ParseCache
+        archive = EntryArchive()
+        FploParser(cache=ParseCache(sys.argv[2])).parse(sys.argv[1], archive, None)
+        print(archive.section_run[0].x_fplo_t_run_hosts)
+    '''
+    for _ in range(2):
+        result = subprocess.run(
+            [sys.executable, '-c', script, str(mainfile), str(tmp_path / 'cache')],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True,
+            check=True)
+        assert result.stdout.splitlines()[-1] == 'r12'
+    assert len(os.listdir(str(tmp_path / 'cache'))) == 1
+
+
+def test_metainfo_cache(tmp_path):
+    # the first process writes the cache, the second loads the metainfo from it
+    script = '''if True:
+        import sys, json
+        from nomad.datamodel import EntryArchive
+        from fploparser import FploParser
+        archive = EntryArchive()
+        FploParser().parse('tests/data/hcp_ti/out', archive, None)
+        print(json.dumps(dict(
+            imported='fploparser.metainfo.fplo_input_autogenerated' in sys.modules,
+            archive=archive.m_to_dict())))
+    '''
+    # the caches of other installs are kept, the stale ones of this install are removed
+    name = os.path.basename(metainfo.cache_path())
+    stale = '-'.join(name.split('-')[:2]) + '-0000000000000000-0.0.0.json'
+    other = 'metainfo-00000000-0000000000000000-0.0.0.json'
+    for path in [stale, other]:
+        (tmp_path / path).write_text('{}')
+    env = dict(os.environ, FPLO_METAINFO_CACHE=str(tmp_path))
+    results = []
+    for _ in range(2):
+        result = subprocess.run(
+            [sys.executable, '-c', script], env=env, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, universal_newlines=True, check=True)
+        results.append(json.loads(result.stdout.splitlines()[-1]))
+
+    assert sorted(os.listdir(str(tmp_path))) == sorted([name, other])
+    assert results[0]['imported'] and not results[1]['imported']
+    assert results[0]['archive'] == results[1]['archive']
+    assert results[1]['archive']['section_run'][0]['section_method'][0]['x_fplo_in']
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_quantities(use_mmap):
+    parser = FploParser(use_mmap=use_mmap)
+    archive = EntryArchive()
+    parser.parse('tests/data/dhcp_gd/out', archive, None)
+    sec_sccs = archive.section_run[0].section_single_configuration_calculation
+
+    # the header is only read up to the first SCF iteration
+    projected = EntryArchive()
+    parser.parse(
+        'tests/data/dhcp_gd/out', projected, None,
+        quantities=['program_version', 'section_run/section_system/lattice_vectors'])
+    sec_run = projected.section_run[0]
+    assert sec_run.program_version == '14.00 M-CPA 47'
+    assert sec_run.section_system[0].lattice_vectors is not None
+    assert sec_run.section_system[0].atom_positions is None
+    assert not sec_run.section_method and not sec_run.section_single_configuration_calculation
+    assert 'scf_iteration' not in parser.out_parser.block_index.names
+
+    # all calculations with only their energies
+    projected = EntryArchive()
+    parser.parse('tests/data/dhcp_gd/out', projected, None, quantities=['energy_total'])
+    sec_run = projected.section_run[0]
+    assert len(sec_run.section_single_configuration_calculation) == 35
+    assert sec_run.section_single_configuration_calculation[-1].energy_total == sec_sccs[34].energy_total
+    assert sec_run.section_system == [] and sec_run.x_fplo_density_spin_up is None
+
+    # only the last calculation
+    projected = EntryArchive()
+    parser.parse('tests/data/dhcp_gd/out', projected, None, quantities=[
+        'program_version',
+        'section_run/section_single_configuration_calculation[-1]/energy_total',
+        'section_run/section_single_configuration_calculation[-1]/energy_reference_fermi'])
+    sec_run = projected.section_run[0]
+    assert sec_run.program_version == '14.00 M-CPA 47'
+    sec_scc = sec_run.section_single_configuration_calculation[0]
+    assert len(sec_run.section_single_configuration_calculation) == 1
+    assert sec_scc.energy_total == sec_sccs[34].energy_total
+    assert sec_scc.energy_reference_fermi == sec_sccs[-1].energy_reference_fermi
+    assert sec_run.x_fplo_fermi_energy is None
+
+    # the Fermi energies without their SCF iterations
+    projected = EntryArchive()
+    parser.parse('tests/data/dhcp_gd/out', projected, None, quantities=['energy_reference_fermi'])
+    sec_run = projected.section_run[0]
+    assert len(sec_run.section_single_configuration_calculation) == len(sec_sccs)
+    assert sec_run.x_fplo_fermi_iteration is None
+
+    with pytest.raises(ValueError):
+        parser.parse('tests/data/dhcp_gd/out', EntryArchive(), None, quantities=['energy'])
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_quantities_truncated(tmp_path, use_mmap):
+    archive = EntryArchive()
+    FploParser().parse('tests/data/hcp_ti/out', archive, None)
+    sec_sccs = archive.section_run[0].section_single_configuration_calculation
+
+    # the output ends within the last box of the total energy
+    with open('tests/data/hcp_ti/out', 'rb') as f:
+        content = f.read()
+    mainfile = tmp_path / 'out'
+    mainfile.write_bytes(content[:content.rindex(b'TOTAL ENERGY') + 200])
+
+    projected = EntryArchive()
+    FploParser(use_mmap=use_mmap).parse(str(mainfile), projected, None, quantities=[
+        'section_run/section_single_configuration_calculation[-1]/energy_total'])
+    sec_run = projected.section_run[0]
+    assert len(sec_run.section_single_configuration_calculation) == 1
+    assert sec_run.section_single_configuration_calculation[0].energy_total == sec_sccs[12].energy_total
+
+
+@pytest.mark.parametrize('compressed', [False, True])
+def test_header_only(tmp_path, compressed):
+    mainfile = compress(str(tmp_path / 'out.gz')) if compressed else 'tests/data/hcp_ti/out'
+
+    parser = FploParser()
+    archive = EntryArchive()
+    parser.parse(mainfile, archive, None, header_only=True)
+
+    sec_run = archive.section_run[0]
+    assert sec_run.program_version == '14.00 M-CPA 47'
+    assert sec_run.x_fplo_program_version_sub == 'M-CPA'
+    assert sec_run.x_fplo_t_run_hosts == 'r12'
+    assert sec_run.time_run_date_start.magnitude == 1435655756
+    assert sec_run.x_fplo_compound == 'hcp Ti'
+    assert sec_run.x_fplo_job_id == '1660594.rhone'
+    assert not sec_run.section_method and not sec_run.section_system
+    # only the head of the file is read
+    assert max(end for _, end in parser.out_parser.block_index.spans) <= parser.header_size
+    assert parser.out_parser.checkpoint[0] <= parser.header_size
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_header_limit(use_mmap):
+    with open('tests/data/hcp_ti/out', 'rb') as f:
+        start = f.read().index(b'Compound: hcp Ti')
+    # a line across the limit is not read
+    out_parser = OutParser(
+        'tests/data/hcp_ti/out', use_mmap=use_mmap, selection=['compound'], limit=start + 12)
+    assert out_parser.get('compound') is None
+    out_parser.limit = start + 17
+    assert out_parser.get('compound') == 'hcp Ti'
+
+
+def test_reverse_lines(tmp_path):
+    mainfile = tmp_path / 'out'
+    content = b'first\n\nthird line\n' + b'x' * 10 + b'\nlast'
+    mainfile.write_bytes(content)
+    with open(mainfile, 'rb') as f:
+        for block_size in [1, 4, 1 << 16]:
+            lines = list(reverse_lines(f, 0, len(content), block_size))
+            assert b''.join(reversed(lines)) == content
+            assert lines[0] == b'last' and lines[-2] == b'\n'
+            assert list(reverse_lines(f, 6, len(content), block_size)) == lines[:-1]
+
+
+@pytest.mark.parametrize('compressed', [False, True])
+def test_tail_only(tmp_path, compressed):
+    mainfile = compress(str(tmp_path / 'out.gz')) if compressed else 'tests/data/hcp_ti/out'
+
+    parser = FploParser()
+    archive = EntryArchive()
+    parser.parse(mainfile, archive, None, tail_only=True)
+
+    sec_run = archive.section_run[0]
+    assert sec_run.x_fplo_run_status == 'converged'
+    assert sec_run.run_clean_end
+    assert list(sec_run.x_fplo_scf_iteration) == [14]
+    sec_sccs = sec_run.section_single_configuration_calculation
+    assert len(sec_sccs) == 1
+    assert sec_sccs[0].energy_total.magnitude == approx(-2.73593114e-16)
+    assert sec_sccs[0].energy_reference_fermi[0].magnitude == approx(-2.47754186e-20)
+    assert not sec_run.section_system and sec_run.program_version is None
+    if not compressed:
+        # only the last iteration is read
+        assert parser.out_parser.block_index.names.count('scf_iteration') == 1
+        assert parser.out_parser.block_index.spans[0][0] > 0.9 * os.path.getsize(mainfile)
+
+
+def test_run_status(tmp_path):
+    with open('tests/data/hcp_ti/out', 'rb') as f:
+        content = f.read()
+    parser = FploParser()
+
+    def status(content, tail_only):
+        mainfile = tmp_path / 'out'
+        mainfile.write_bytes(content)
+        archive = EntryArchive()
+        parser.parse(str(mainfile), archive, None, tail_only=tail_only)
+        return archive.section_run[0].x_fplo_run_status, archive.section_run[0].run_clean_end
+
+    for tail_only in [False, True]:
+        assert status(content, tail_only) == ('converged', True)
+        assert status(content.replace(b' CONVERGED\n', b'\n'), tail_only) == (
+            'not converged', True)
+        # the output ends within the last iteration
+        truncated = content[:content.rindex(b'SCF: iteration 14')]
+        assert status(truncated, tail_only) == ('crashed', False)
+
+    # a running output is not crashed until it is complete
+    mainfile = tmp_path / 'out'
+    mainfile.write_bytes(truncated)
+    state = parser.resume(str(mainfile))
+    sec_run = state.archive.section_run[0]
+    assert sec_run.x_fplo_run_status == 'running' and sec_run.run_clean_end is None
+    mainfile.write_bytes(content)
+    state = parser.resume(str(mainfile), state)
+    assert sec_run.x_fplo_run_status == 'converged' and sec_run.run_clean_end
+
+    # no output is no run
+    for tail_only in [False, True]:
+        assert status(b'', tail_only) == (None, None)
+    with pytest.raises(FileNotFoundError):
+        parser.parse(str(tmp_path / 'missing'), EntryArchive(), None)
+    with pytest.raises(FileNotFoundError):
+        parser.resume(str(tmp_path / 'missing'))